@@ -1,13 +1,19 @@
-import pandas as pd
-import networkx as nx
-from community import best_partition, modularity
-from sklearn.metrics.cluster import normalized_mutual_info_score
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import importlib
+import os
+import threading
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import ttk
-from matplotlib.figure import Figure
+from task_runner import TaskRunner
+from tracing import tracer
+from results_table import ResultsTable, TableModel
+
+# The analysis stack (networkx, pandas, scipy, sklearn, matplotlib) takes seconds to
+# import, so handlers import it on first use and the window opens without it. Once the
+# window is up, PRELOAD_MODULES are imported in a background thread.
+PRELOAD_MODULES = ["networkx", "pandas", "sklearn.metrics", "matplotlib.figure",
+                   "matplotlib.backends.backend_tkagg", "graph_store", "partition_cache", "link_analysis",
+                   "centrality", "centrality_index", "community_metrics", "layout", "render"]
 
 global selected_option
 class NetworkAnalysisGUI:
@@ -15,6 +21,13 @@ class NetworkAnalysisGUI:
         self.master = master
         master.title("Network Analysis GUI")
 
+        # graph store, partition cache, link analysis and canvas are created on first use
+        self._graph_store = None
+        self._partition_cache = None
+        self._link_analysis = None
+        self._canvas = None
+        self.current_view = None
+
         # Create frame for buttons on the left
         button_frame = tk.Frame(master, width=200,background="#58D68D")
         button_frame.pack(side=tk.LEFT, fill=tk.Y)
@@ -35,8 +48,8 @@ class NetworkAnalysisGUI:
 
         text_label = tk.Label(button_frame, text=" Adjusting Nodes and Edges \n (Based on calculated metrics) ", font=("TkDefaultFont", 13,"bold"),background="#58D68D")
         text_label.pack(pady=(15,0),padx=10)
-        self.visualize_button =  ttk.Button(button_frame, style="1Custom.TButton",text="Adjusting Graph", command=lambda: self.visualize_graph(True,True,selected_option),width=25)
-        self.visualize_button.pack(pady=5, padx=10, anchor='center')
+        self.adjust_button =  ttk.Button(button_frame, style="1Custom.TButton",text="Adjusting Graph", command=lambda: self.visualize_graph(True,True,selected_option),width=25)
+        self.adjust_button.pack(pady=5, padx=10, anchor='center')
 
 
         text_label = tk.Label(button_frame, text=" Community detection evaluations ", font=("TkDefaultFont", 13,"bold"),background="#58D68D")
@@ -57,6 +70,11 @@ class NetworkAnalysisGUI:
                                     command=lambda: self.calculate_community_coverage(selected_option), width=20)
         self.CC_Button.pack(pady=3, anchor='center')
 
+        # several seeded Louvain runs in parallel, their agreement and consensus
+        self.Stability_Button = ttk.Button(button_frame, style="Custom.TButton", text=" Louvain Stability",
+                                           command=lambda: self.calculate_stability(selected_option), width=20)
+        self.Stability_Button.pack(pady=3, anchor='center')
+
 
         # # Create a label for the text
         text_label = tk.Label(button_frame, text="Filter Nodes Based on Centrality", font=("TkDefaultFont", 13,"bold"),background="#58D68D")
@@ -73,6 +91,20 @@ class NetworkAnalysisGUI:
             button_frame, style="Custom.TButton", text="  Betweeness centrality", command=lambda: self.filter_betweenness_centrality(selected_option), width=22)
         self.filter_Betweeness_centrality_btn.pack(pady=3, padx=10, anchor='center')
 
+        # Exact (single process), Parallel (source nodes split over every core) or
+        # Sampled (k random sources, reported with a standard error)
+        betweenness_frame = tk.Frame(button_frame, background="#58D68D")
+        betweenness_frame.pack(pady=(0, 3), anchor='center')
+        self.betweenness_mode = tk.StringVar(value='Exact')
+        ttk.Combobox(betweenness_frame, textvariable=self.betweenness_mode, values=['Exact', 'Parallel', 'Sampled'],
+                     state='readonly', width=8).pack(side=tk.LEFT, padx=2)
+        tk.Label(betweenness_frame, text="k", background="#58D68D").pack(side=tk.LEFT)
+        self.betweenness_k = tk.StringVar(value="50")
+        tk.Entry(betweenness_frame, textvariable=self.betweenness_k, width=5).pack(side=tk.LEFT, padx=2)
+        tk.Label(betweenness_frame, text="seed", background="#58D68D").pack(side=tk.LEFT)
+        self.betweenness_seed = tk.StringVar(value="42")
+        tk.Entry(betweenness_frame, textvariable=self.betweenness_seed, width=4).pack(side=tk.LEFT, padx=2)
+
         self.filter_eigenvector_centrality_btn = ttk.Button(
             button_frame, style="Custom.TButton", text="  Eigenvector centrality", command=lambda: self.filter_eigenvector_centrality(selected_option), width=22)
         self.filter_eigenvector_centrality_btn.pack(pady=3, padx=10, anchor='center')
@@ -88,6 +120,9 @@ class NetworkAnalysisGUI:
         self.PageRank_Button = ttk.Button(button_frame, style="Custom.TButton",
                                           text=" Nodes Page Rank ", command=lambda: self.calculate_pagerank(selected_option))
         self.PageRank_Button.pack(pady=5, anchor='center')
+        self.ClassPageRank_Button = ttk.Button(button_frame, style="Custom.TButton",
+                                               text=" Page Rank per Class ", command=lambda: self.calculate_class_pagerank(selected_option))
+        self.ClassPageRank_Button.pack(pady=(0, 5), anchor='center')
 
 
         # Create frame for output text on the right
@@ -106,6 +141,10 @@ class NetworkAnalysisGUI:
         self.node_button_top = ttk.Button(button_frame_top,style="1Custom.TButton", text="Load Node CSV", command=self.load_node_file)
         self.node_button_top.pack(side=tk.LEFT, padx=5,pady=(10,2))
 
+        # new contacts are merged into the cached graph instead of rebuilding it
+        self.append_button_top = ttk.Button(output_frame, style="1Custom.TButton", text="Append Edge CSV", command=self.append_edge_file)
+        self.append_button_top.pack(pady=(0, 5))
+
         options = ['Direct Graph', 'Undirect Graph']
         # create a StringVar to hold the selected option
         selected_option = tk.StringVar()
@@ -119,12 +158,14 @@ class NetworkAnalysisGUI:
 
 
         # create the ComboBox
-        combo_box = ttk.Combobox(
+        combo_box = self.combo_box = ttk.Combobox(
             output_frame, textvariable=selected_option, values=options, state='readonly')
         combo_box.pack(pady=(0, 0))
         
         # add event binding to remove the placeholder text when the user clicks on the combo box
         combo_box.bind('<FocusIn>', on_click)
+        # switching between Direct/Undirect invalidates the cached graph
+        combo_box.bind('<<ComboboxSelected>>', lambda event: self.set_graph_type(selected_option.get()))
         
 
         # Create text widget to display conductance values
@@ -132,8 +173,11 @@ class NetworkAnalysisGUI:
         self.Text_Panal.pack(pady=10, anchor='center')
 
         # Create input field to get user input
-        text_label = tk.Label(output_frame, text=" Filter Nodes Based on value greater \n than Specific Value ", font=("TkDefaultFont", 13,"bold"),background="#58D68D",foreground="#FF1818")
-        text_label.pack(pady=(0,0),padx=10)
+        # per-node results are shown in a virtualized table swapped in for the text panel
+        self.results_table = ResultsTable(output_frame, height=30, width=35, background="#58D68D")
+
+        self.filter_label = tk.Label(output_frame, text=" Filter Nodes Based on value greater \n than Specific Value ", font=("TkDefaultFont", 13,"bold"),background="#58D68D",foreground="#FF1818")
+        self.filter_label.pack(pady=(0,0),padx=10)
         self.user_input = tk.StringVar()
         self.input_field = tk.Entry( output_frame, textvariable=self.user_input, width=20, font=('Arial', 14), bg='#F5F5F5', fg='#333333', bd=2, relief=tk.GROOVE,justify="center")
         self.input_field.pack(pady=(5, 0), padx=(10, 10), anchor='center')
@@ -146,6 +190,87 @@ class NetworkAnalysisGUI:
         self.clear_button = ttk.Button(output_frame,style="2Custom.TButton" ,text="Clear", command=self.clear_input_field)
         self.clear_button.pack(side=tk.TOP,pady=7)
 
+        # Progress of the running analysis, with a button to abort it
+        self.status_text = tk.StringVar(value="Ready")
+        status_label = tk.Label(output_frame, textvariable=self.status_text, font=("TkDefaultFont", 10), background="#58D68D")
+        status_label.pack(pady=(5, 0))
+        self.progress_bar = ttk.Progressbar(output_frame, mode='determinate', length=200, maximum=100)
+        self.progress_bar.pack(pady=3)
+        self.cancel_button = ttk.Button(output_frame, style="2Custom.TButton", text="Cancel", command=self.cancel_task)
+        self.cancel_button.pack(side=tk.TOP, pady=(0, 7))
+        self.cancel_button.state(['disabled'])
+
+        # per-stage timing of every action, optional cProfile capture, Chrome trace export
+        trace_frame = tk.Frame(output_frame, background="#58D68D")
+        trace_frame.pack(pady=(0, 7))
+        self.timing_enabled = tk.BooleanVar(value=False)
+        self.profile_enabled = tk.BooleanVar(value=False)
+        tk.Checkbutton(trace_frame, text="Timings", variable=self.timing_enabled, background="#58D68D",
+                       command=self.toggle_tracing).pack(side=tk.LEFT)
+        tk.Checkbutton(trace_frame, text="cProfile", variable=self.profile_enabled, background="#58D68D",
+                       command=self.toggle_tracing).pack(side=tk.LEFT)
+        ttk.Button(trace_frame, text="Export Trace", command=self.export_trace).pack(side=tk.LEFT, padx=3)
+
+        # Buttons that need the graph are disabled while a job is running
+        self.analysis_buttons = [self.visualize_button, self.adjust_button, self.conductance_button,
+                                 self.Modularity_Button, self.NMI_Button, self.CC_Button, self.Stability_Button,
+                                 self.filter_degree_centrality_btn, self.filter_closeness_centrality_btn,
+                                 self.filter_Betweeness_centrality_btn, self.filter_eigenvector_centrality_btn,
+                                 self.filter_harmonic_centrality_btn, self.PageRank_Button, self.ClassPageRank_Button,
+                                 self.edge_button_top, self.append_button_top, self.combo_box]
+        self.task_runner = TaskRunner(master, on_update=self.update_task_status)
+        # (dependency, version) of the result on screen, used to flag it stale after an append
+        self.shown_versions = None
+        # partition on screen, and the one the next Louvain run starts from after an append
+        self._last_partition = None
+        self._warm_start = None
+        self.node_df = None
+        master.after(500, self.preload)
+
+    def preload(self):
+        """Imports the analysis stack in the background, so the first click does not wait."""
+        def run():
+            for name in PRELOAD_MODULES:
+                importlib.import_module(name)
+        threading.Thread(target=run, daemon=True).start()
+
+    @property
+    def graph_store(self):
+        """Graphs are built once per loaded edge file and shared by every handler."""
+        if self._graph_store is None:
+            from graph_store import GraphStore
+            self._graph_store = GraphStore()
+        return self._graph_store
+
+    @property
+    def partition_cache(self):
+        """Louvain partitions are cached per dataset so all evaluation panels agree."""
+        if self._partition_cache is None:
+            from partition_cache import PartitionCache
+            self._partition_cache = PartitionCache()
+        return self._partition_cache
+
+    @property
+    def link_analysis(self):
+        """Sparse power iteration, warm-started from the previous scores."""
+        if self._link_analysis is None:
+            from link_analysis import LinkAnalysis
+            self._link_analysis = LinkAnalysis()
+        return self._link_analysis
+
+    @property
+    def canvas(self):
+        """One figure and canvas for every view, cleared and redrawn instead of stacked."""
+        if self._canvas is None:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            from matplotlib.figure import Figure
+            self._canvas = FigureCanvasTkAgg(Figure(), master=self.master)
+        return self._canvas
+
+    @property
+    def figure(self):
+        return self.canvas.figure
+
     # Define function to clear the input field
     def clear_input_field(self):
         self.input_field.delete(0, tk.END)
@@ -154,33 +279,227 @@ class NetworkAnalysisGUI:
         # Open file dialog to select edge CSV file
         edge_filepath = filedialog.askopenfilename(title="Select Edge CSV File")
 
-        # Load edge CSV file into pandas dataframe
-        self.edge_df = pd.read_csv(edge_filepath)
+        # Load edge CSV file into pandas dataframe (typed, cached in a binary sidecar)
+        from edge_io import read_edge_csv
+        tracer.begin("Load edges")
+        self.edge_df = read_edge_csv(edge_filepath)
+        self.graph_store.load_edges(self.edge_df)
+        self._last_partition = self._warm_start = None
+        if tracer.enabled:
+            self.show_text()
+            self.Text_Panal.delete('1.0', tk.END)
+        self.show_timing()
+
+    def set_graph_type(self, graph_type):
+        """Combobox handler: a partition of the other graph type is no seed for this one."""
+        self.graph_store.set_graph_type(graph_type)
+        self._last_partition = self._warm_start = None
+
+    def append_edge_file(self):
+        """Merges a CSV of new contacts into the loaded edges and the cached graph."""
+        edge_filepath = filedialog.askopenfilename(title="Select Edge CSV File to Append")
+        if not edge_filepath:
+            return
+        # a batch is read once, no point writing a sidecar for it
+        from edge_io import read_edge_csv
+        tracer.begin("Append edges")
+        batch_df = read_edge_csv(edge_filepath, use_cache=False)
+
+        def compute(task):
+            task.progress("merging contacts")
+            return self.graph_store.append_edges(batch_df)
+
+        def display(result):
+            new_pairs, new_nodes = result
+            if self._warm_start is None:
+                self._warm_start = self._last_partition
+            self.status_text.set(f"Appended {len(batch_df)} contacts")
+            if self.results_stale():
+                self.prepend_note(" Stale : the data changed, run the analysis again\n")
+            if new_pairs is not None:
+                self.prepend_note(f" +{len(batch_df)} contacts, +{new_pairs} pairs, +{new_nodes} nodes")
+            self.show_timing()
+
+        # merging changes the shared graph in place, so it runs to the end once started
+        self.task_runner.submit("Append edges", self.traced(compute), on_done=display, on_error=self.show_error,
+                                cancellable=False)
+
+    def versions(self, depends):
+        if depends == 'weights':
+            return depends, self.graph_store.weights_version
+        return depends, self.graph_store.structure_version
+
+    def results_stale(self):
+        """True when the inputs of the result on screen changed since it was computed
+        (an append of repeat contacts only makes the weighted views stale)."""
+        if self.shown_versions is None:
+            return False
+        return self.versions(self.shown_versions[0]) != self.shown_versions
 
     def load_node_file(self):
         # Open file dialog to select node CSV file
         node_filepath = filedialog.askopenfilename(title="Select Node CSV File")
 
         # Load node CSV file into pandas dataframe
-        self.node_df = pd.read_csv(node_filepath)
+        from edge_io import read_node_csv
+        self.node_df = read_node_csv(node_filepath)
+
+    def run_task(self, name, compute, display, depends='structure'):
+        """Runs compute(task) in a worker thread and display(result) back on the Tk thread.
+        depends is 'structure' or 'weights', the part of the graph the result is based on."""
+        tracer.begin(name)
+        self.task_runner.submit(name, self.traced(compute), on_done=self.recording(display, depends),
+                                on_error=self.show_error)
+
+    @staticmethod
+    def traced(compute):
+        """Marks the worker part of an action as its "compute" stage (profiled with cProfile)."""
+        def wrapped(task):
+            with tracer.stage("compute", profiled=True):
+                return compute(task)
+        return wrapped
+
+    def recording(self, display, depends):
+        """Wraps display so the data version the result was computed from is remembered."""
+        versions = self.versions(depends)
+
+        def wrapped(result):
+            self.shown_versions = versions
+            self.show_text()
+            with tracer.stage("display", profiled=True):
+                display(result)
+            self.show_timing()
+        return wrapped
+
+    def cancel_task(self):
+        if self.task_runner.cancel():
+            tracer.discard()
+
+    def show_error(self, exc):
+        tracer.discard()
+        self.show_text()
+        self.Text_Panal.delete('1.0', tk.END)
+        self.Text_Panal.insert(tk.END, f" Error : {exc}\n")
+
+    def update_task_status(self, task):
+        """Shows progress and elapsed time of the running task (None when idle)."""
+        if task is None:
+            self.status_text.set("Ready")
+            self.progress_bar.configure(mode='determinate', value=0)
+            for button in self.analysis_buttons:
+                button.state(['!disabled'])
+            self.cancel_button.state(['disabled'])
+            return
+        stage = f" - {task.stage}" if task.stage else ""
+        if task.cancelled:
+            stage = " - cancelling, waiting for the current step"
+        self.status_text.set(f"{task.name}{stage} ({task.elapsed:.1f}s)")
+        if task.fraction is None:
+            self.progress_bar.configure(mode='indeterminate')
+            self.progress_bar.step(5)
+        else:
+            self.progress_bar.configure(mode='determinate', value=task.fraction * 100)
+        for button in self.analysis_buttons:
+            button.state(['disabled'])
+        self.cancel_button.state(['!disabled'] if task.cancellable and not task.cancelled else ['disabled'])
+
+    def show_text(self):
+        """Puts the text panel back in place of the results table."""
+        if self.results_table.winfo_manager():
+            self.results_table.pack_forget()
+            self.Text_Panal.pack(pady=10, anchor='center', before=self.filter_label)
+
+    def show_table(self, model, note=""):
+        """Shows a TableModel in the results table instead of the text panel."""
+        if not self.results_table.winfo_manager():
+            self.Text_Panal.pack_forget()
+            self.results_table.pack(pady=10, anchor='center', before=self.filter_label)
+        self.results_table.show(model, note)
+
+    def toggle_tracing(self):
+        tracer.profile = self.profile_enabled.get()
+        tracer.enabled = self.timing_enabled.get() or tracer.profile
+
+    def show_timing(self):
+        """Adds the stage breakdown of the action that just finished below its result;
+        with cProfile the top functions go to the console (and the exported trace)."""
+        report = tracer.end()
+        if report is None:
+            return
+        if self.results_table.winfo_manager():
+            self.results_table.set_note(self.results_table.note.get() + "\n" + report)
+        else:
+            self.Text_Panal.insert(tk.END, "\n" + report + "\n")
+        if tracer.profile:
+            print(tracer.profile_text())
+
+    def export_trace(self):
+        """Saves every action timed so far as a Chrome trace / Perfetto JSON file."""
+        path = filedialog.asksaveasfilename(title="Export Trace", defaultextension=".json",
+                                            filetypes=[("Chrome trace", "*.json")])
+        if path:
+            paths = tracer.export_chrome_trace(path)
+            self.status_text.set("Saved " + ", ".join(os.path.basename(p) for p in paths))
+
+    def prepend_note(self, note):
+        """Adds a line above whatever result is on screen."""
+        if self.results_table.winfo_manager():
+            self.results_table.set_note(note + "\n" + self.results_table.note.get())
+        else:
+            self.Text_Panal.insert('1.0', note + "\n")
+
+    def new_axes(self):
+        """Clears the shared figure for a new view and returns its axes."""
+        self.figure.clear()
+        self.current_view = None
+        return self.figure.add_subplot()
+
+    def show_figure(self, relx, width, height):
+        """Redraws the shared canvas, placed with the geometry of the current view."""
+        if tracer.enabled:
+            # draw now instead of when Tk is idle, so the drawing time is measured
+            with tracer.stage("draw canvas", profiled=True):
+                self.canvas.draw()
+        else:
+            self.canvas.draw_idle()
+        self.canvas.get_tk_widget().place(relx=relx, rely=0.5, anchor=tk.CENTER, width=width, height=height)
+
+    def get_partition(self):
+        """Returns the Louvain partition of the current graph, shared by every panel.
+        After an append, Louvain starts from the partition shown before it."""
+        partition = self.partition_cache.get(self.graph_store.undirected(), self.graph_store.content_hash(),
+                                             self.graph_store.is_directed(), init_partition=self._warm_start)
+        self._last_partition = partition
+        self._warm_start = None
+        return partition
 
 # 2- Modularity internal evaluation
     def calculate_modularity(self, selected_option):
-        """Calculates the modularity of the detected communities and prints the result."""
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target",create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target",create_using=nx.Graph())
-
-        communities=list(nx.algorithms.community.greedy_modularity_communities(G))
-        modularity=nx.algorithms.community.modularity(G,communities)
+        """Calculates the modularity of the Louvain partition shared with the other panels
+        and prints it with the contribution of each community."""
+        graph_type = selected_option.get()
+
+        def compute(task):
+            from community_metrics import partition_modularity
+            G = self.graph_store.graph(graph_type)
+            task.progress("Louvain partition")
+            partition = self.get_partition()
+
+            task.progress("modularity")
+            return partition_modularity(G, partition, per_community=True)
+
+        def display(result):
+            modularity, contributions = result
+            # Delete existing text in the text widget
+            self.Text_Panal.delete('1.0', tk.END)
+            community ="Modularity "
+            self.Text_Panal.insert(tk.END, "          Internal evaluation      \n")
+            self.Text_Panal.insert(tk.END, "  "+f"{community} = {modularity:.5f}\n\n")
+            # Display the contribution of each community in the text widget
+            for community_id, contribution in contributions.items():
+                self.Text_Panal.insert(tk.END, f" Community {community_id} = {contribution:.5f}\n")
 
-        # Delete existing text in the text widget
-        self.Text_Panal.delete('1.0', tk.END)
-        community ="Modularity "
-        self.Text_Panal.insert(tk.END, "          Internal evaluation      \n")
-        # Display conductance values for each community in the text widget
-        self.Text_Panal.insert(tk.END, "  "+f"{community} = {modularity:.5f}\n")
+        self.run_task("Modularity", compute, display)
 
 
 # 4- Calculate NMI External Evaluation
@@ -189,489 +508,410 @@ class NetworkAnalysisGUI:
         and the ground truth communities, and prints the result."""
         # Load ground truth communities from CSV file
         ground_truth_file =self.node_df
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target",create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target",create_using=nx.Graph())
-        partition = best_partition(G)
+        graph_type = selected_option.get()
 
-        ground_truth_dict = dict(zip(ground_truth_file['ID'], ground_truth_file['Class']))
-        # Calculate NMI between detected communities and ground truth communities
-        #print(list(set(partition.values())))
+        def compute(task):
+            from sklearn.metrics.cluster import normalized_mutual_info_score
+            G = self.graph_store.graph(graph_type)
+            task.progress("Louvain partition")
+            partition = self.get_partition()
 
-        # Convert ground truth values format to lists of integers
-        unique_labels = list(set(ground_truth_dict.values()))
-        labels_map = {label: i for i, label in enumerate(unique_labels)}
-        ground_truth_communites = [labels_map[ground_truth_dict[node]] for node in G.nodes()]
-        #print(list(set(ground_truth_communites)))
+            ground_truth_dict = dict(zip(ground_truth_file['ID'], ground_truth_file['Class']))
+            # Convert ground truth values format to lists of integers
+            unique_labels = list(set(ground_truth_dict.values()))
+            labels_map = {label: i for i, label in enumerate(unique_labels)}
+            ground_truth_communites = [labels_map[ground_truth_dict[node]] for node in G.nodes()]
 
-        nmi = normalized_mutual_info_score(ground_truth_communites, list(partition.values()))
-        # Delete existing text in the text widget
-        self.Text_Panal.delete('1.0', tk.END)
-        community ="NMI VALUE "
-        self.Text_Panal.insert(tk.END, "          External evaluation      \n")
-        self.Text_Panal.insert(tk.END,"  "+ f"{community} = {nmi:.4f}\n")
+            task.progress("NMI")
+            return normalized_mutual_info_score(ground_truth_communites, [partition[node] for node in G.nodes()])
+
+        def display(nmi):
+            # Delete existing text in the text widget
+            self.Text_Panal.delete('1.0', tk.END)
+            community ="NMI VALUE "
+            self.Text_Panal.insert(tk.END, "          External evaluation      \n")
+            self.Text_Panal.insert(tk.END,"  "+ f"{community} = {nmi:.4f}\n")
+
+        self.run_task("NMI", compute, display)
+
+    def calculate_stability(self, selected_option, runs=10):
+        """Runs Louvain with several seeds on every core and shows how much the runs agree
+        (pairwise NMI / ARI), the NMI of each run to the node classes and the consensus."""
+        ground_truth = None
+        if self.node_df is not None:
+            ground_truth = dict(zip(self.node_df['ID'], self.node_df['Class']))
+
+        import numpy as np
+
+        def compute(task):
+            from louvain import louvain_ensemble
+            from partition_cache import DEFAULT_SEED
+            G = self.graph_store.undirected()
+            task.progress("Louvain runs", 0)
+            result = louvain_ensemble(G, runs=runs, seed=DEFAULT_SEED, processes=None, ground_truth=ground_truth,
+                                      progress=lambda fraction: task.progress("Louvain runs", fraction))
+            # one row per run: its own numbers, then its NMI to every other run
+            columns = ['run', 'seed', 'communities', 'modularity']
+            arrays = [np.arange(runs), result['seeds'], result['communities'], result['modularity']]
+            if ground_truth is not None:
+                columns.append('NMI Class')
+                arrays.append(result['class_nmi'])
+            columns += ['mean NMI', 'mean ARI'] + [f"NMI {i}" for i in range(runs)]
+            # mean agreement with the other runs, leaving out the 1 on the diagonal
+            arrays += [(result['nmi'].sum(axis=1) - 1) / (runs - 1), (result['ari'].sum(axis=1) - 1) / (runs - 1)]
+            arrays += list(result['nmi'].T)
+            return result, TableModel(columns, arrays, digits=3)
+
+        def display(output):
+            result, model = output
+            off_diagonal = ~np.eye(runs, dtype=bool)
+            note = (f" Louvain Stability ({runs} runs) :\n"
+                    f" mean pairwise NMI = {result['nmi'][off_diagonal].mean():.4f}"
+                    f", ARI = {result['ari'][off_diagonal].mean():.4f}\n"
+                    f" consensus communities = {len(set(result['consensus'].values()))}")
+            if ground_truth is not None:
+                note += f", NMI Class = {result['consensus_nmi']:.4f}"
+            self.show_table(model, note)
+
+        self.run_task("Louvain Stability", compute, display)
 
     def calculate_community_coverage(self, selected_option):
-        self.Text_Panal.delete('1.0', tk.END)
         """Calculates the coverage of each community and prints the result."""
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(
-                self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.Graph())        
-
-        partition = best_partition(G.to_undirected())
-
-        communities = set(partition.values())
-        self.Text_Panal.insert(tk.END, "Communities coverage Values : \n\n")
-        for community_id in communities:
-            community_nodes = [node for node in G.nodes() if partition[node] == community_id]
-            internal_edges = G.subgraph(community_nodes).number_of_edges()
-            total_edges = sum([G.degree(node) for node in community_nodes])
-            coverage = internal_edges / total_edges
-            self.Text_Panal.insert(tk.END, f" Community {  community_id} = {coverage:.4f}\n")
-
-        # Delete existing text in the text widget
-
-
-    def calculate_conductance(self, G, partition):
-        """Calculates the conductance of each community 
-        and returns the conductance values for each community."""
-        def conductance(G, community):
-            Eoc = 0
-            Ec = 0
-            for node in community:
-                neighbors = set(G.neighbors(node))
-                for neighbor in neighbors:
-                    if neighbor not in community:
-                        if G.has_edge(node, neighbor):
-                            if G[node][neighbor].get('weight') is not None:
-                                Eoc += G[node][neighbor]['weight']
-                            else:
-                                Eoc += 1
-                    else:
-                        if G.has_edge(node, neighbor):
-                            if G[node][neighbor].get('weight') is not None:
-                                Ec += G[node][neighbor]['weight']
-                            else:
-                                Ec += 1
-            if Ec == 0:
-                return 1
-            else:
-                return 2 * Eoc / (2 * Ec + Eoc)
-        communities = {c: [] for c in set(partition.values())}
-        for node, community in partition.items():
-            communities[community].append(node)
+        graph_type = selected_option.get()
 
-        conductance_values = {f"community {c} : conductance": conductance(G, community) for c, community in communities.items()}
-        return conductance_values
+        def compute(task):
+            from community_metrics import community_coverage
+            G = self.graph_store.graph(graph_type)
+            task.progress("Louvain partition")
+            partition = self.get_partition()
 
-    def calculate_and_display_conductance(self, selected_option):
-        # Create network graph from edge dataframe
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(
-                self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(
-                self.edge_df, source="Source", target="Target", create_using=nx.Graph())
-        # Partition nodes into communities using Louvain algorithm
-        partition = best_partition(G.to_undirected())
+            task.progress("coverage")
+            return community_coverage(G, partition, weight="contacts")
 
-        # Calculate conductance values for each community
-        conductance_values = self.calculate_conductance(G, partition)
+        def display(coverages):
+            self.Text_Panal.delete('1.0', tk.END)
+            self.Text_Panal.insert(tk.END, "Communities coverage Values : \n\n")
+            for community_id, coverage in coverages.items():
+                self.Text_Panal.insert(tk.END, f" Community {  community_id} = {coverage:.4f}\n")
+            average_coverage = sum(coverages.values()) / len(coverages)
+            self.Text_Panal.insert(tk.END, f"\n Average Coverage = {average_coverage:.4f}\n")
 
-    # Calculate average conductance across all communities
-        avg_conductance = sum(conductance_values.values()) / len(conductance_values)
+        self.run_task("Community Coverage", compute, display)
 
-        # Delete existing text in the text widget
-        self.Text_Panal.delete('1.0', tk.END)
-        self.Text_Panal.insert(tk.END," Community Conductance : \n \n")
-        # Display conductance values for each community in the text widget
-        for community, conductance in conductance_values.items():
-            self.Text_Panal.insert(tk.END, f"{community} = {conductance:.4f}\n")
-    # Display average conductance across all communities
-        self.Text_Panal.insert(tk.END, f"\n Average Conductance = {avg_conductance:.4f}\n")
-    
 
-    def calculate_pagerank(self, selected_option):
-        """Calculates the PageRank score for each node in the graph and prints the result."""
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(
-                self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.Graph())        
+    def calculate_and_display_conductance(self, selected_option):
+        graph_type = selected_option.get()
 
-        pagerank = nx.pagerank(G)
-        self.Text_Panal.delete('1.0', tk.END)
-        self.Text_Panal.insert(tk.END," Page Rank Nodes Values : \n \n")
-        for node, score in sorted(pagerank.items(), key=lambda x: x[1], reverse=True):
-            self.Text_Panal.insert(tk.END," Node "+ f"{node} = {score:.4f}\n")
+        def compute(task):
+            # Create network graph from edge dataframe
+            G = self.graph_store.graph(graph_type)
+            # Partition nodes into communities using Louvain algorithm
+            task.progress("Louvain partition")
+            partition = self.get_partition()
 
+            # Calculate conductance values for each community
+            from community_metrics import calculate_conductance
+            task.progress("conductance")
+            return calculate_conductance(G, partition)
 
-    def visualize_graph(self, apply_nodeSize=False, apply_edges_weight=False, selected_option=""):
-        # Create network graph from edge dataframe
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.Graph())
+        def display(conductance_values):
+            # Calculate average conductance across all communities
+            avg_conductance = sum(conductance_values.values()) / len(conductance_values)
 
+            # Delete existing text in the text widget
+            self.Text_Panal.delete('1.0', tk.END)
+            self.Text_Panal.insert(tk.END," Community Conductance : \n \n")
+            # Display conductance values for each community in the text widget
+            for community, conductance in conductance_values.items():
+                self.Text_Panal.insert(tk.END, f"{community} = {conductance:.4f}\n")
+            # Display average conductance across all communities
+            self.Text_Panal.insert(tk.END, f"\n Average Conductance = {avg_conductance:.4f}\n")
 
-        partition = best_partition(G.to_undirected())
-        edge_weights = self.edge_df.groupby(["Source", "Target"]).size().to_dict()
+        self.run_task("Conductance", compute, display)
 
-        # Draw network graph with nodes colored by community
-        pos = nx.spring_layout(G)
-        cmap = plt.cm.tab20
-        node_colors = [partition[node] for node in G.nodes()]
 
-        node_sizes = 250  # default value of node sizes
-        if apply_nodeSize:  # if the user wants to apply the node sizes
+    def calculate_pagerank(self, selected_option):
+        """Calculates the PageRank score for each node in the graph and prints the result."""
+        graph_type = selected_option.get()
+
+        def compute(task):
+            G = self.graph_store.graph(graph_type)
+            task.progress("page rank")
+            pagerank = self.link_analysis.pagerank(G)
+            model = TableModel(['Node ID', 'pagerank'], [list(pagerank), list(pagerank.values())])
+            model.sort(1)
+            return model
+
+        def display(model):
+            self.show_table(model, " Page Rank Nodes Values :")
+
+        self.run_task("Page Rank", compute, display)
+
+    def calculate_class_pagerank(self, selected_option):
+        """Personalized PageRank teleporting to each Class of the node file, all
+        classes computed together in one batched power iteration."""
+        graph_type = selected_option.get()
+        node_df = self.node_df
+
+        def compute(task):
+            if node_df is None:
+                raise ValueError("Load a node CSV file first")
+            groups = node_df.groupby('Class', observed=True)['ID'].apply(list).to_dict()
+            G = self.graph_store.graph(graph_type)
+            task.progress("personalized page rank")
+            return self.link_analysis.personalized_pagerank(G, groups)
+
+        def display(ranks):
             self.Text_Panal.delete('1.0', tk.END)
-            degree_dict = {node: G.degree(node) for node in G}
-            sorted_degrees = sorted(degree_dict.items(), key=lambda x: x[1], reverse=True)
-            for node, degree in sorted_degrees:
-                self.Text_Panal.insert(tk.END, f"Node {node} : {degree}\n")
-
-            if len(G.nodes()) <= 50:
-                node_sizes = [G.degree(node) * 100 for node in G.nodes()]
-            else:
-                node_sizes = [G.degree(node) *5 for node in G.nodes()]
-            
+            self.Text_Panal.insert(tk.END, " Top Nodes Page Rank per Class : \n")
+            for label in ranks.columns:
+                self.Text_Panal.insert(tk.END, f"\n Class {label}\n")
+                for node, score in ranks[label].nlargest(5).items():
+                    self.Text_Panal.insert(tk.END, " Node " + f"{node} = {score:.4f}\n")
 
-        fig, ax = plt.subplots()
-        nodes = nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=node_sizes, cmap=cmap, ax=ax)
+        self.run_task("Page Rank per Class", compute, display)
 
-        if len(G.edges()) <= 100:
-            w = 1
-            scalling_factor = 1
-        else:
-            w = 0.1
-            scalling_factor = 500
 
+    def visualize_graph(self, apply_nodeSize=False, apply_edges_weight=False, selected_option=""):
+        import networkx as nx
+        from matplotlib import cm
+        from layout import graph_layout
+        from render import draw_edge_collection, important_labels, use_fast_mode
+        graph_type = selected_option.get()
 
-        if apply_edges_weight:
-            if 'Weight' in self.edge_df.columns:
-                edges = nx.draw_networkx_edges(G, pos, ax=ax, width=self.edge_df['Weight'] / 5000, edge_color='black')
+        def compute(task):
+            # Create network graph from edge dataframe
+            G = self.graph_store.graph(graph_type)
+            task.progress("Louvain partition")
+            partition = self.get_partition()
+            degrees = None
+            if apply_nodeSize:
+                degrees = TableModel(['Node ID', 'degree'], [list(G.nodes()), [degree for node, degree in G.degree()]])
+                degrees.sort(1)
+            # number of contacts of each pair, aggregated once by the graph store
+            edge_weights = nx.get_edge_attributes(G, 'contacts')
+            # cached per graph, warm-started after an append
+            pos = graph_layout(G, progress=self.layout_progress(task))
+            return G, partition, edge_weights, pos, degrees
+
+        def display(result):
+            G, partition, edge_weights, pos, degrees = result
+            # Draw network graph with nodes colored by community
+            cmap = cm.tab20
+            node_colors = [partition[node] for node in G.nodes()]
+
+            node_sizes = 250  # default value of node sizes
+            if apply_nodeSize:  # if the user wants to apply the node sizes
+                self.show_table(degrees, " Node Degrees :")
+
+                if len(G.nodes()) <= 50:
+                    node_sizes = [G.degree(node) * 100 for node in G.nodes()]
+                else:
+                    node_sizes = [G.degree(node) *5 for node in G.nodes()]
+
+            ax = self.new_axes()
+            nodes = nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=node_sizes, cmap=cmap, ax=ax)
+
+            if len(G.edges()) <= 100:
+                w = 1
+                scalling_factor = 1
             else:
-                edges = nx.draw_networkx_edges(G, pos, ax=ax, width=[edge_weights.get((u, v), w) / scalling_factor for u, v in G.edges()], edge_color='black')
-        else:  # for louvian Button
-            edges = nx.draw_networkx_edges(G, pos, ax=ax, width=0.1, edge_color='gray')
-
+                w = 0.1
+                scalling_factor = 500
+
+            if apply_edges_weight:
+                if 'Weight' in self.graph_store.columns:
+                    edge_width = [G[u][v]['Weight'] / 5000 for u, v in G.edges()]
+                else:
+                    edge_width = [edge_weights.get((u, v), w) / scalling_factor for u, v in G.edges()]
+                edge_color = 'black'
+            else:  # for louvian Button
+                edge_width, edge_color = 0.1, 'gray'
+
+            # dense graphs: one alpha-blended collection for all edges and only the
+            # best connected nodes labelled, instead of an artist per edge and node
+            fast = use_fast_mode(G)
+            if fast:
+                edges = draw_edge_collection(ax, G, pos, width=edge_width, color=edge_color, arrows=G.is_directed())
+                labels = important_labels(G)
+            else:
+                edges = nx.draw_networkx_edges(G, pos, ax=ax, width=edge_width, edge_color=edge_color)
+                labels = {node: node for node in G.nodes()}
+            nx.draw_networkx_labels(G, pos, labels=labels, font_size=6, ax=ax)
+
+            if graph_type == 'Direct Graph' and not fast:
+                nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_weights, label_pos=0.3, font_size=6, ax=ax)
+
+            ax.set_title('Louvain algorithm')
+            self.figure.colorbar(mappable=cm.ScalarMappable(cmap=cmap), label="Community", ax=ax)
+            ax.axis('off')
+            self.show_figure(relx=0.497, width=870, height=700)
+
+        self.run_task("Louvain Graph", compute, display, depends='weights' if apply_edges_weight else 'structure')
+
+    def filter_nodes_by_centrality(self, selected_option, column, centrality_func, node_color, title, digits=3,
+                                   compute=None, source=None):
+        """Shared body of the filter_*_centrality buttons: computes the measure once per
+        graph into the centrality index, then draws the nodes matching the filter typed
+        by the user (a threshold, "top 10", "90%" or conditions on already computed
+        measures such as "betweenness > 0.01 and degree > 0.3").
+
+        compute(task, G) returns (scores, error, note): per-node standard errors (or
+        None) and a message shown above the table (or None); by default the scores are
+        centrality_func(G). source tells apart differently computed scores of the same
+        measure (e.g. sampled betweenness), a new source recomputes them."""
+        import networkx as nx
+        from matplotlib import cm
+        from centrality_index import centrality_index, parse_query
+        from layout import sub_layout
+        from render import MAX_LABELS, draw_edge_collection, update_edge_collection, use_fast_mode
+        graph_type = selected_option.get()
+        user_input = self.user_input.get()
+        if compute is None:
+            compute = lambda task, G: (centrality_func(G), None, None)
+
+        def run(task):
+            # building the graph and its index can take a while on large inputs
+            G = self.graph_store.graph(graph_type)
+            index = centrality_index(G)
+            if not index.has(column, source):
+                scores, error, note = compute(task, G)
+                index.add(column, scores, error, note, source)
+            # threshold changes only search the sorted scores, nothing is recomputed
+            conditions = parse_query(user_input, column, index)
+            positions = index.where(conditions, order_by=column)
+            measures = list(dict.fromkeys([column] + [condition[0] for condition in conditions]))
+            filtered_nodes = index.nodes[positions].tolist()
+            pos = sub_layout(G, filtered_nodes, progress=self.layout_progress(task))
+            df = index.table(positions, measures, digits)
+            model = TableModel.from_frame(df, [0] + [digits + 1 if name == 'std_error' else digits for name in df.columns])
+            return G, model, filtered_nodes, pos, index.note(column)
+
+        def display(result):
+            G, model, filtered_nodes, pos, note = result
+
+            # Create a new graph with only the filtered nodes
+            filtered_G = G.subgraph(filtered_nodes)
+
+            # Set node color and size for filtered nodes
+            cmap = cm.tab20
+            if (len(G.nodes()) <= 100):
+                node_sizes = 1000
+            else:
+                node_sizes = 250
+
+            # Generate visualization, moving the artists of the previous view of the same
+            # measure (e.g. after a threshold change) instead of drawing new ones
+            view_key = (title, G, graph_type)
+            view = self.current_view
+            labels = {node: node for node in filtered_nodes}
+            if use_fast_mode(filtered_G):
+                labels = {node: node for node in filtered_nodes[:MAX_LABELS]}  # highest scores first
+            if (view is not None and view[0] == view_key and filtered_nodes
+                    and update_edge_collection(*view[3], filtered_G, pos)):
+                ax, nodes, edges, label_texts = view[1:]
+                nodes.set_offsets([pos[node] for node in filtered_nodes])
+                for text in label_texts.values():
+                    text.remove()
+            else:
+                ax = self.new_axes()
+                nodes = nx.draw_networkx_nodes(filtered_G, pos, nodelist=filtered_nodes, node_color=node_color, node_size=node_sizes, cmap=cmap, ax=ax)
+                # all edges (and arrowheads) in one collection, not one annotate call per edge
+                edges = draw_edge_collection(ax, filtered_G, pos, color='black', width=1.0,
+                                             arrows=graph_type == 'Direct Graph')
+                # positions come from the layout of the whole graph, keep its frame
+                ax.set_xlim(-1.1, 1.1)
+                ax.set_ylim(-1.1, 1.1)
+                ax.axis('off')
 
-        labels = {node: node for node in G.nodes()}
-        nx.draw_networkx_labels(G, pos, labels=labels, font_size=6, ax=ax)
+            label_texts = nx.draw_networkx_labels(filtered_G, pos, labels=labels, font_size=7, ax=ax)
+            ax.set_title(f'{title} {user_input}')
+            if filtered_nodes and nodes.axes is ax:
+                self.current_view = (view_key, ax, nodes, edges, label_texts)
 
-        if selected_option == 'Direct Graph':
-            nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_weights, label_pos=0.3, font_size=6, ax=ax)
+            self.show_table(model, note or "")
 
-        plt.title('Louvain algorithm')
-        plt.colorbar(mappable=plt.cm.ScalarMappable(cmap=cmap), label="Community")
-        plt.axis('off')
+            self.show_figure(relx=0.5, width=800, height=600)
 
-        # Embed the plot in the GUI using a canvas
-        canvas = FigureCanvasTkAgg(fig, master=self.master)
-        canvas.draw()
-        canvas.get_tk_widget().place(relx=0.497, rely=0.5, anchor=tk.CENTER, width=870, height=700)
+        self.run_task(title.strip(), run, display)
 
     def filter_degree_centrality(self, selected_option):
-        # Create network graph from edge dataframe
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.Graph())  
-
-        # Compute degree centrality for each node and create a DataFrame to store the results
-        degree_centrality = nx.degree_centrality(G)
-        df = pd.DataFrame(index=G.nodes())
-        df.index.name = 'Node ID'
-        df['degree_centrality'] = pd.Series(degree_centrality).round(3)
-        df = df.sort_values(by='degree_centrality', ascending=False)
-        user_input = self.user_input.get()
-        if not user_input:
-            user_input = 0
-        else:
-            user_input = float(user_input)
-
-        # Filter nodes based on degree centrality
-        filtered_nodes = sorted([node for node in G.nodes() if degree_centrality[node] >= user_input],
-                    key=lambda node: degree_centrality[node], reverse=True)
-        # Create a new graph with only the filtered nodes
-        filtered_G = G.subgraph(filtered_nodes)
-
-        # Set node color and size for filtered nodes
-        cmap = plt.cm.tab20
-        node_colors = '#FC3131'
-        if (len(G.nodes()) <= 100):
-            node_sizes = 1000
-        else:
-            node_sizes = 250
-
-        # Generate visualization
-        pos = nx.spring_layout(filtered_G)
-        fig, ax = plt.subplots()
-        nodes = nx.draw_networkx_nodes(filtered_G, pos, node_color=node_colors, node_size=node_sizes, cmap=cmap, ax=ax )
-        if (selected_option.get() == 'Direct Graph'):
-            for u, v, data in filtered_G.edges(data=True):
-                ax.annotate("", xy=pos[v], xytext=pos[u], arrowprops=dict(arrowstyle="->", color="Black"))
-        else:
-            nx.draw_networkx_edges(filtered_G, pos, ax=ax)
-
-        labels = {node: node for node in filtered_nodes}
-        nx.draw_networkx_labels(filtered_G, pos, labels=labels, font_size=7, ax=ax)
-        plt.title(f'     Degree Centrality Greater {user_input}')
-        plt.axis('off')
-
-        # Insert degree centrality values in the Text_Panal
-        filtered_df = df.loc[filtered_nodes]
-        self.Text_Panal.delete('1.0', tk.END)
-        self.Text_Panal.insert('1.0', filtered_df.to_string())
-
-        # Embed the plot in the GUI using a canvas
-        canvas = FigureCanvasTkAgg(fig, master=self.master)
-        canvas.draw()
-        canvas.get_tk_widget().place(relx=0.5, rely=0.5, anchor=tk.CENTER, width=800, height=600)
+        import networkx as nx
+        def compute(task, G):
+            # maintained incrementally by the graph store across appends
+            return self.graph_store.degree_centrality(), None, None
+
+        self.filter_nodes_by_centrality(selected_option, 'degree_centrality', nx.degree_centrality,
+                                  '#FC3131', '     Degree Centrality Greater', compute=compute)
+
+    @staticmethod
+    def layout_progress(task):
+        return lambda fraction: task.progress("layout", fraction)
+
+    def sweep_compute(self, measure):
+        """Compute for the filters backed by the shared shortest-path sweep: the first
+        of closeness/harmonic/betweenness pays for the traversals, the others reuse
+        the cached result."""
+        def compute(task, G):
+            from centrality import shortest_path_sweep
+            sweep = shortest_path_sweep(G, progress=lambda fraction: task.progress("shortest paths", fraction))
+            return sweep[measure], None, None
+        return compute
 
     def filter_betweenness_centrality(self, selected_option):
-        # Create network graph from edge dataframe
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(
-                self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.Graph())        
-
-        # Compute degree centrality for each node and create a DataFrame to store the results
-        betweenness_centrality = nx.betweenness_centrality(G)
-
-        df = pd.DataFrame(index=G.nodes())
-        df.index.name = 'Node ID'
-        df['betweenness_centrality'] = pd.Series(betweenness_centrality).round(3)
-        df = df.sort_values(by='betweenness_centrality', ascending=False)
-        user_input = self.user_input.get()
-        if not user_input:
-            user_input = 0
-        else:
-            user_input = float(user_input)
-
-        # Filter nodes based on degree centrality
-        filtered_nodes = sorted([node for node in G.nodes() if betweenness_centrality[node] >= user_input],
-                    key=lambda node: betweenness_centrality[node], reverse=True)
-        # Create a new graph with only the filtered nodes
-        filtered_G = G.subgraph(filtered_nodes)
-
-        # Set node color and size for filtered nodes
-        cmap = plt.cm.tab20
-        node_colors = '#F7DC6F'
-        if (len(G.nodes()) <= 100):
-            node_sizes = 1000
-        else:
-            node_sizes = 250
-        # Generate visualization
-        pos = nx.spring_layout(filtered_G)
-        fig, ax = plt.subplots()
-        nodes = nx.draw_networkx_nodes(filtered_G, pos, node_color=node_colors, node_size=node_sizes, cmap=cmap, ax=ax)
-        if (selected_option.get() == 'Direct Graph'):
-            for u, v, data in filtered_G.edges(data=True):
-                ax.annotate("", xy=pos[v], xytext=pos[u], arrowprops=dict(arrowstyle="->", color="Black"))
-        else:
-            nx.draw_networkx_edges(filtered_G, pos, ax=ax)
-        labels = {node: node for node in filtered_nodes}
-        nx.draw_networkx_labels(filtered_G, pos, labels=labels, font_size=7, ax=ax)
-        plt.title(f'     Betweeness Centrality Greater {user_input}')
-        plt.axis('off')
-
-        # Insert degree centrality values in the Text_Panal
-        filtered_df = df.loc[filtered_nodes]
-        self.Text_Panal.delete('1.0', tk.END)
-        self.Text_Panal.insert('1.0', filtered_df.to_string())
-
-        # Embed the plot in the GUI using a canvas
-        canvas = FigureCanvasTkAgg(fig, master=self.master)
-        canvas.draw()
-        canvas.get_tk_widget().place(relx=0.5, rely=0.5, anchor=tk.CENTER, width=800, height=600)
-
+        import networkx as nx
+        mode = self.betweenness_mode.get()
+        compute = self.sweep_compute('betweenness')
+        source = None  # exact and parallel give the same scores
+        if mode != 'Exact':
+            k = int(self.betweenness_k.get()) if mode == 'Sampled' else None
+            seed = int(self.betweenness_seed.get() or 0)
+            # the pool runs in its own processes, so this stage is driven from a thread
+            processes = None if mode == 'Parallel' else 1
+            if k is not None:
+                source = ('sampled', k, seed)
+
+            def compute(task, G):
+                from centrality import brandes_betweenness
+                centrality, error = brandes_betweenness(G, k=k, seed=seed, processes=processes,
+                                                        progress=lambda fraction: task.progress(mode, fraction))
+                return centrality, (error if k is not None else None), None
+
+        self.filter_nodes_by_centrality(selected_option, 'betweenness_centrality', nx.betweenness_centrality,
+                                  '#F7DC6F', '     Betweeness Centrality Greater', compute=compute, source=source)
 
     def filter_eigenvector_centrality(self, selected_option):
-        # Create network graph from edge dataframe
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(
-                self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.Graph())
-
-        # Compute degree centrality for each node and create a DataFrame to store the results
-        eigenvector_centrality = nx.eigenvector_centrality(G)
-
-        df1 = pd.DataFrame(index=G.nodes())
-        df1.index.name = 'Node ID'
-        df1['eigenvector_centrality'] = pd.Series(eigenvector_centrality).round(3)
-        df1 = df1.sort_values(by='eigenvector_centrality', ascending=False)
-        user_input = self.user_input.get()
-        if not user_input:
-            user_input = 0
-        else:
-            user_input = float(user_input)
-
-        # Filter nodes based on degree centrality
-        filtered_nodes = sorted([node for node in G.nodes() if eigenvector_centrality[node] >= user_input],
-                    key=lambda node: eigenvector_centrality[node], reverse=True)
-        # Create a new graph with only the filtered nodes
-        filtered_G = G.subgraph(filtered_nodes)
-
-        # Set node color and size for filtered nodes
-        cmap = plt.cm.tab20
-        node_colors = '#85C1E9'
-        if (len(G.nodes()) <= 100):
-            node_sizes = 1000
-        else:
-            node_sizes = 250
-        # Generate visualization
-        pos = nx.spring_layout(filtered_G)
-        fig, ax = plt.subplots()
-        nodes = nx.draw_networkx_nodes(filtered_G, pos, node_color=node_colors, node_size=node_sizes, cmap=cmap, ax=ax )
-        if (selected_option.get() == 'Direct Graph'):
-            for u, v, data in filtered_G.edges(data=True):
-                ax.annotate("", xy=pos[v], xytext=pos[u], arrowprops=dict(arrowstyle="->", color="Black"))
-        else:
-            nx.draw_networkx_edges(filtered_G, pos, ax=ax)        
-        labels = {node: node for node in filtered_nodes}
-        nx.draw_networkx_labels(filtered_G, pos, labels=labels, font_size=7, ax=ax)
-        plt.title(f'     Eigenvector Centrality Greater {user_input}')
-        plt.axis('off')
-
-        # Insert degree centrality values in the Text_Panal
-        filtered_df = df1.loc[filtered_nodes]
-        self.Text_Panal.delete('1.0', tk.END)
-        self.Text_Panal.insert('1.0', filtered_df.to_string())
-
-        # Embed the plot in the GUI using a canvas
-        canvas = FigureCanvasTkAgg(fig, master=self.master)
-        canvas.draw()
-        canvas.get_tk_widget().place(relx=0.5, rely=0.5, anchor=tk.CENTER, width=800, height=600)
+        import networkx as nx
+        def compute(task, G):
+            task.progress("eigenvector centrality")
+            # an acyclic digraph never converges, show the last iterate instead of failing
+            centrality = self.link_analysis.eigenvector(G, strict=False)
+            iterations, converged = self.link_analysis.last_run['eigenvector']
+            note = None if converged else f" Not converged after {iterations} iterations"
+            return centrality, None, note
+
+        self.filter_nodes_by_centrality(selected_option, 'eigenvector_centrality', nx.eigenvector_centrality,
+                                  '#85C1E9', '     Eigenvector Centrality Greater', compute=compute)
 
     def filter_harmonic_centrality(self, selected_option):
-            # Create network graph from edge dataframe
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(
-                self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.Graph())
-
-        # Compute degree centrality for each node and create a DataFrame to store the results
-        harmonic_centrality = nx.harmonic_centrality(G)
-
-        df = pd.DataFrame(index=G.nodes())
-        df.index.name = 'Node ID'
-        df['harmonic_centrality'] = pd.Series(harmonic_centrality).round(4)
-        df = df.sort_values(by='harmonic_centrality', ascending=False)
-        user_input = self.user_input.get()
-        if not user_input:
-            user_input = 0
-        else:
-            user_input = float(user_input)
-
-        # Filter nodes based on degree centrality
-        filtered_nodes = sorted([node for node in G.nodes() if harmonic_centrality[node] >= user_input],
-                    key=lambda node: harmonic_centrality[node], reverse=True)
-        # Create a new graph with only the filtered nodes
-        filtered_G = G.subgraph(filtered_nodes)
-
-        # Set node color and size for filtered nodes
-        cmap = plt.cm.tab20
-        node_colors = '#F1948A'
-        if (len(G.nodes()) <= 100):
-            node_sizes = 1000
-        else:
-            node_sizes = 250
-        # Generate visualization
-        pos = nx.spring_layout(filtered_G)
-        fig, ax = plt.subplots()
-        nodes = nx.draw_networkx_nodes(filtered_G, pos, node_color=node_colors, node_size=node_sizes, cmap=cmap, ax=ax )
-        if (selected_option.get() == 'Direct Graph'):
-            for u, v, data in filtered_G.edges(data=True):
-                ax.annotate("", xy=pos[v], xytext=pos[u], arrowprops=dict(arrowstyle="->", color="Black"))
-        else:
-            nx.draw_networkx_edges(filtered_G, pos, ax=ax)
-        labels = {node: node for node in filtered_nodes}
-        nx.draw_networkx_labels(filtered_G, pos, labels=labels, font_size=7, ax=ax)
-        plt.title(f'   harmonic Centrality Greater {user_input}')
-        plt.axis('off')
-
-        # Insert degree centrality values in the Text_Panal
-        filtered_df = df.loc[filtered_nodes]
-        self.Text_Panal.delete('1.0', tk.END)
-        self.Text_Panal.insert('1.0', filtered_df.to_string())
-
-        # Embed the plot in the GUI using a canvas
-        canvas = FigureCanvasTkAgg(fig, master=self.master)
-        canvas.draw()
-        canvas.get_tk_widget().place(relx=0.5, rely=0.5, anchor=tk.CENTER, width=800, height=600)
-
+        import networkx as nx
+        self.filter_nodes_by_centrality(selected_option, 'harmonic_centrality', nx.harmonic_centrality,
+                                  '#F1948A', '   harmonic Centrality Greater', digits=4,
+                                  compute=self.sweep_compute('harmonic'))
 
     def filter_closeness_centrality(self, selected_option):
-        # Create network graph from edge dataframe
-        if (selected_option.get() == 'Direct Graph'):
-            G = nx.from_pandas_edgelist(
-                self.edge_df, source="Source", target="Target", create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(self.edge_df, source="Source", target="Target", create_using=nx.Graph())
-
-        # Compute degree centrality for each node and create a DataFrame to store the results
-        closeness_centrality = nx.closeness_centrality(G)
-
-        df = pd.DataFrame(index=G.nodes())
-        df.index.name = 'Node ID'
-        df['closeness_centrality'] = pd.Series(closeness_centrality).round(3)
-        df = df.sort_values(by='closeness_centrality', ascending=False)
-
-        user_input = self.user_input.get()
-        if not user_input:
-            user_input = 0
-        else:
-            user_input = float(user_input)
-
-        # Filter nodes based on degree centrality
-        filtered_nodes = sorted([node for node in G.nodes() if closeness_centrality[node] >= user_input],
-                    key=lambda node: closeness_centrality[node], reverse=True)
-        # Create a new graph with only the filtered nodes
-        filtered_G = G.subgraph(filtered_nodes)
-
-        # Set node color and size for filtered nodes
-        cmap = plt.cm.tab20
-        node_colors = '#58D68D'
-        if (len(G.nodes()) <= 100):
-            node_sizes = 1000
-        else:
-            node_sizes = 250
-        # Generate visualization
-        pos = nx.spring_layout(filtered_G)
-        fig, ax = plt.subplots()
-        nodes = nx.draw_networkx_nodes(filtered_G, pos, node_color=node_colors, node_size=node_sizes, cmap=cmap, ax=ax )
-        if (selected_option.get() == 'Direct Graph'):
-            for u, v, data in filtered_G.edges(data=True):
-                ax.annotate("", xy=pos[v], xytext=pos[u], arrowprops=dict(arrowstyle="->", color="Black"))
-        else:
-            nx.draw_networkx_edges(filtered_G, pos, ax=ax)
-        labels = {node: node for node in filtered_nodes}
-        nx.draw_networkx_labels(filtered_G, pos, labels=labels, font_size=7, ax=ax)
-        plt.title(f'       Closeness Centrality Greater {user_input}')
-        plt.axis('off')
-
-        # Insert degree centrality values in the Text_Panal
-        filtered_df = df.loc[filtered_nodes]
-        self.Text_Panal.delete('1.0', tk.END)
-        self.Text_Panal.insert('1.0', filtered_df.to_string())
-
-        # Embed the plot in the GUI using a canvas
-        canvas = FigureCanvasTkAgg(fig, master=self.master)
-        canvas.draw()
-        canvas.get_tk_widget().place(relx=0.5, rely=0.5, anchor=tk.CENTER, width=800, height=600)
+        import networkx as nx
+        self.filter_nodes_by_centrality(selected_option, 'closeness_centrality', nx.closeness_centrality,
+                                  '#58D68D', '       Closeness Centrality Greater',
+                                  compute=self.sweep_compute('closeness'))
 
 
 
-root = tk.Tk()
-root.geometry("1200x800")
-gui = NetworkAnalysisGUI(root)
-root.configure(bg="#D5F5E3")
-root.wm_state("zoomed")
-root.mainloop()
+if __name__ == "__main__":
+    # guarded so worker processes can import this module without opening a window
+    root = tk.Tk()
+    root.geometry("1200x800")
+    gui = NetworkAnalysisGUI(root)
+    root.configure(bg="#D5F5E3")
+    root.wm_state("zoomed")
+    root.mainloop()
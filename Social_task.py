@@ -1,27 +1,49 @@
-import pandas as pd
-import networkx as nx
-from community import best_partition, modularity
-from sklearn.metrics.cluster import normalized_mutual_info_score
-import matplotlib.pyplot as plt
-
-# Load graph from CSV file
-edge_filepath = pd.read_csv("primaryschool_Edges .csv")
-node_filepath = pd.read_csv("metadata_primaryschool_Nodes.csv")
-#print(edge_filepath)
-G = nx.from_pandas_edgelist(edge_filepath,source="Source",target="Target",create_using=nx.MultiGraph())
-print("Number of nodes: ", G.number_of_nodes())
-print("Number of edges: ", G.number_of_edges())
+# Importing this module only defines the functions below (e.g. for the batch runner or
+# a notebook); the data is loaded and evaluated by main() when it is run as a script.
+# pandas, networkx and the analysis modules are imported by the functions that use
+# them, so the import itself stays cheap.
+EDGE_FILE = "primaryschool_Edges .csv"
+NODE_FILE = "metadata_primaryschool_Nodes.csv"
+
+
+def load_data(edge_file=EDGE_FILE, node_file=NODE_FILE):
+    """Reads the edge and node CSV files and returns (edge_df, node_df, G)."""
+    from edge_io import read_edge_csv, read_node_csv
+    from graph_store import aggregate_contacts, contact_graph
+    edge_df = read_edge_csv(edge_file)
+    node_df = read_node_csv(node_file)
+    # Repeated contacts are collapsed into one weighted edge per pair ('contacts' = number of rows)
+    G = contact_graph(aggregate_contacts(edge_df), directed=False)
+    return edge_df, node_df, G
+
 
 # Task 1 
 #(Louvain algorithm) Find the communities using Louvain algorithm
-# Apply Louvain algorithm
-partition = best_partition(G)
+def detect_communities(G, edge_df):
+    """Louvain partition of G, cached on disk so reruns on the same data reuse it."""
+    from graph_store import hash_edges
+    from partition_cache import PartitionCache
+    return PartitionCache().get(G, hash_edges(edge_df), directed=False)
+
 
-def visualize_communities(G):
+def _partition(G, partition):
+    # the functions below take the partition from main(), or run Louvain themselves
+    if partition is not None:
+        return partition
+    from louvain import best_partition
+    from partition_cache import DEFAULT_SEED
+    return best_partition(G, random_state=DEFAULT_SEED)
+
+
+def visualize_communities(G, partition=None):
     """Applies the Louvain algorithm and generates a visualization of the graph with
       node colors based on the detected communities."""
+    import matplotlib.pyplot as plt
+    import networkx as nx
+    from layout import graph_layout
+    partition = _partition(G, partition)
     # Generate visualization
-    pos = nx.spring_layout(G)
+    pos = graph_layout(G)
     cmap = plt.cm.tab20
     node_colors = [partition[node] for node in G.nodes()]
     node_sizes = [G.degree(node) for node in G.nodes()]
@@ -40,35 +62,11 @@ def visualize_communities(G):
 # 1- Conductance internal evaluation
 
 
-def calculate_conductance(G, partition):
-    """Calculates the conductance of each community 
-    and returns the conductance values for each community."""
-    def conductance(G, community):
-        Eoc = 0
-        Ec = 0
-        for node in community:
-            neighbors = set(G.neighbors(node))
-            for neighbor in neighbors:
-                if neighbor not in community:
-                    if G.has_edge(node, neighbor):
-                        Eoc += G[node][neighbor]['weight'] if G.is_directed() else 1 
-                        # it adds the weight of the edge (or 1 if the graph is unweighted) to Eoc.
-                else:
-                    Ec += G[node][neighbor]['weight'] if G.is_directed() else 1
-                    # it adds the weight of the edge (or 1 if the graph is unweighted) to Ec.
-        if Ec == 0:
-            return 1
-        else:
-            return 2 * Eoc / (2 * Ec + Eoc)
-
-    communities = {c: [] for c in set(partition.values())}
-    for node, community in partition.items():
-        communities[community].append(node)
-
-    conductance_values = {f"community {c} : conductance": conductance(G, communities[c]) for c in communities}
-
-    # Return the conductance values for each community
-    return conductance_values
+def calculate_conductance(G, partition, weight='weight'):
+    """Conductance of each community, see community_metrics.calculate_conductance
+    (vectorized over a CSR adjacency matrix instead of a per-neighbor loop)."""
+    from community_metrics import calculate_conductance
+    return calculate_conductance(G, partition, weight=weight)
 
 # print(calculate_conductance(G, partition))
 
@@ -76,39 +74,60 @@ def calculate_conductance(G, partition):
 
 
 # 2- Modularity internal evaluation
-def calculate_modularity(G):
-    """Calculates the modularity of the detected communities and prints the result."""
-    communities=list(nx.algorithms.community.greedy_modularity_communities(G))
-    modularity=nx.algorithms.community.modularity(G,communities)
-    #print(modularity)
+def calculate_modularity(G, partition=None):
+    """Calculates the modularity of the detected (Louvain) communities and prints the result."""
+    from community_metrics import partition_modularity
+    partition = _partition(G, partition)
+    modularity = partition_modularity(G, partition)
     print(f"The modularity of the detected communities is : {modularity:.3f}")
+    return modularity
 
 
 # 3- Calculate coverage of each community
-def calculate_community_coverage(G):
-    """Calculates the coverage of each community and prints the result."""
-    communities = set(partition.values())
-    for community_id in communities:
-        community_nodes = [node for node in G.nodes() if partition[node] == community_id]
-        internal_edges = G.subgraph(community_nodes).number_of_edges()
-        total_edges = sum([G.degree(node) for node in community_nodes])
-        coverage = internal_edges / total_edges
+def calculate_community_coverage(G, partition=None):
+    """Calculates the coverage of each community and the average coverage, prints the
+    result and returns the per-community values."""
+    from community_metrics import community_coverage
+    partition = _partition(G, partition)
+    # single pass over the edge list, see community_metrics.coverage_from_edges
+    # each contact counts as one edge, as in the original multigraph
+    coverages = community_coverage(G, partition, weight="contacts")
+    for community_id, coverage in coverages.items():
         print(f"The coverage of community {community_id} is {coverage:.3f}")
-calculate_community_coverage(G)
+    average_coverage = sum(coverages.values()) / len(coverages)
+    print("The average coverage of the communities is {:.3f}".format(average_coverage))
+    return coverages
 
 # 4- Calculate NMI External Evaluation
-def calculate_nmi(G, ground_truth_file):
+def calculate_nmi(G, ground_truth_file, partition=None):
     """Loads the ground truth communities from a CSV file, calculates the NMI between the detected communities
     and the ground truth communities, and prints the result."""
+    from sklearn.metrics.cluster import normalized_mutual_info_score
+    partition = _partition(G, partition)
     # Load ground truth communities from CSV file
     ground_truth_dict = dict(zip(ground_truth_file['ID'], ground_truth_file['Class']))
     # Calculate NMI between detected communities and ground truth communities
     nmi = normalized_mutual_info_score(list(ground_truth_dict.values()), list(partition.values()))
     print("NMI: {0:.3f}".format(nmi))
 # Task 3 
+# sparse power iteration state, shared so repeated calls warm-start
+_link_analysis = None
+
+
+def shared_link_analysis():
+    """The LinkAnalysis shared by calculate_pagerank and compute_centralities, created
+    on first use."""
+    global _link_analysis
+    if _link_analysis is None:
+        from link_analysis import LinkAnalysis
+        _link_analysis = LinkAnalysis()
+    return _link_analysis
+
+
 def calculate_pagerank(G):
     """Calculates the PageRank score for each node in the graph and prints the result."""
-    pagerank = nx.pagerank(G)
+    # sparse power iteration (same scores as nx.pagerank within the tolerance)
+    pagerank = shared_link_analysis().pagerank(G)
     for node, score in sorted(pagerank.items(), key=lambda x: x[1], reverse=True):
         print(f"Node {node}: PageRank score = {score:.3f}")
 
@@ -151,15 +170,30 @@ def calculate_pagerank(G):
 #     plt.axis('off')
 #     plt.show()
 
-def compute_centralities(G):
+def compute_centralities(G, betweenness_mode="exact", k=None, seed=None, processes=None, output_path=None):
     """Computes different centrality measures for each node in the graph 
-    and returns a DataFrame with the results."""
+    and returns a DataFrame with the results (also written to output_path as CSV if given).
+
+    betweenness_mode is "exact" (single process), "parallel" (source nodes split over
+    `processes` worker processes, default every core) or "sampled" (k random sources
+    drawn with seed; a betweenness_error column holds the standard error)."""
+    import networkx as nx
+    import pandas as pd
+    from centrality import brandes_betweenness, shortest_path_sweep
     G = nx.Graph(G)
     degree_centrality = nx.degree_centrality(G)
-    betweenness_centrality = nx.betweenness_centrality(G)
-    eigenvector_centrality = nx.eigenvector_centrality(G)
-    harmonic_centrality = nx.harmonic_centrality(G)
-    closeness_centrality = nx.closeness_centrality(G)
+    # closeness, harmonic and exact betweenness share one set of BFS traversals; the
+    # other modes get betweenness from brandes_betweenness, so the sweep skips it
+    sweep = shortest_path_sweep(G, betweenness=betweenness_mode == "exact")
+    if betweenness_mode == "sampled":
+        betweenness_centrality, betweenness_error = brandes_betweenness(G, k=k, seed=seed, processes=1)
+    elif betweenness_mode == "parallel":
+        betweenness_centrality, betweenness_error = brandes_betweenness(G, processes=processes)
+    else:
+        betweenness_centrality = sweep['betweenness']
+    eigenvector_centrality = shared_link_analysis().eigenvector(G)
+    harmonic_centrality = sweep['harmonic']
+    closeness_centrality = sweep['closeness']
 
     # Create a DataFrame to store the centrality values for each node
     df = pd.DataFrame(index=G.nodes())
@@ -167,13 +201,16 @@ def compute_centralities(G):
     df['degree'] = pd.Series(dict(G.degree())).astype(int)
     df['degree_centrality'] = pd.Series(degree_centrality).round(3)
     df['betweenness_centrality'] = pd.Series(betweenness_centrality).round(3)
+    if betweenness_mode == "sampled":
+        df['betweenness_error'] = pd.Series(betweenness_error).round(4)
     df['eigenvector_centrality'] = pd.Series(eigenvector_centrality).round(3)
     df['harmonic_centrality'] = pd.Series(harmonic_centrality).round(3)
     df['closeness_centrality'] = pd.Series(closeness_centrality).round(3)
 
     df = df.sort_values(by='betweenness_centrality')
     # Export the DataFrame to a CSV file
-    df.to_csv('C:/Users/MSI-PC/Desktop/Social Network Task/output.csv')        
+    if output_path is not None:
+        df.to_csv(output_path)
     return df
 
 
@@ -182,15 +219,6 @@ def compute_centralities(G):
 
 
 
-# define the coverage values of the communities
-community_coverages = [0.437, 0.424, 0.424, 0.359, 0.449, 0.433]
-
-# calculate the average coverage of the communities
-average_coverage = sum(community_coverages) / len(community_coverages)
-
-# print the average coverage
-print("The average coverage of the communities is {:.3f}".format(average_coverage))
-
 # x= compute_centralities(G)
 # print(x)
 
@@ -233,3 +261,15 @@ print("The average coverage of the communities is {:.3f}".format(average_coverag
 
 # calculate_conductance(G, partition)
 
+
+def main():
+    edge_df, node_df, G = load_data()
+    print("Number of nodes: ", G.number_of_nodes())
+    print("Number of edges: ", G.number_of_edges())
+    print("Number of contacts: ", int(G.size(weight="contacts")))
+    partition = detect_communities(G, edge_df)
+    calculate_community_coverage(G, partition)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""Headless entry point: runs a list of analyses on an edge file without Tk and writes
+the results as JSON plus CSV (or Parquet) tables.
+
+    python batch.py "primaryschool_Edges .csv" --nodes metadata_primaryschool_Nodes.csv \\
+        --analyses louvain conductance nmi pagerank betweenness --out results
+    python batch.py contacts.csv --memory-mb 256 --analyses louvain modularity pagerank   # larger than RAM
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from centrality import brandes_betweenness, shortest_path_sweep
+from community_metrics import (conductance_csr, coverage_from_edges, edge_index_arrays, edge_weight_array,
+                               modularity_csr, partition_labels, to_csr)
+from edge_io import read_edge_csv, read_node_csv
+from edge_stream import DEFAULT_MEMORY_MB, ingest_edges
+from graph_store import GraphStore
+from link_analysis import LinkAnalysis
+from louvain import louvain_ensemble, resolution_sweep
+from partition_cache import DEFAULT_RESOLUTION, DEFAULT_SEED, PartitionCache
+
+ANALYSES = ['louvain', 'conductance', 'modularity', 'nmi', 'coverage', 'resolutions', 'ensemble', 'pagerank',
+            'degree', 'closeness', 'harmonic', 'betweenness', 'eigenvector']
+DEFAULT_RESOLUTIONS = [0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 3.0]
+DEFAULT_RUNS = 10
+GRAPH_TYPES = {'undirected': 'Undirect Graph', 'directed': 'Direct Graph'}
+
+
+class BatchAnalysis:
+    """Runs analyses on one graph, sharing the intermediate results between them: the
+    graph is built once, one Louvain partition serves every community measure and
+    closeness, harmonic and exact betweenness come from a single shortest-path sweep.
+
+    The graph is held as a CSRGraph; the networkx graph is only built for the
+    shortest-path based measures (closeness, harmonic, betweenness). Pass edge_df=None
+    and graph, e.g. the memory-mapped CSRGraph of edge_stream.ingest_edges, for edge
+    files that do not fit in memory; graph_type is then taken from the graph.
+
+    Node level results are collected in node_table, per community results in
+    community_table, per resolution results in resolution_table, per Louvain run results
+    in ensemble_table and scalars in summary."""
+
+    def __init__(self, edge_df, node_df=None, graph_type='Undirect Graph', resolution=DEFAULT_RESOLUTION,
+                 seed=DEFAULT_SEED, betweenness_k=None, processes=1, partition_cache=None, refine=False,
+                 resolutions=None, runs=DEFAULT_RUNS, graph=None):
+        self.graph_store = None
+        if graph is None:
+            self.graph_store = GraphStore()
+            self.graph_store.load_edges(edge_df)
+            self.graph_store.set_graph_type(graph_type)
+            graph = self.graph_store.csr()
+        self.graph = graph
+        self.node_df = node_df
+        self.resolution = resolution
+        self.sweep_resolutions = resolutions or DEFAULT_RESOLUTIONS
+        self.refine = refine
+        self.runs = runs
+        self.seed = seed
+        self.betweenness_k = betweenness_k
+        self.processes = processes
+        self.partition_cache = partition_cache if partition_cache is not None else PartitionCache()
+        self.link_analysis = LinkAnalysis()
+        self.nodes = self.graph.nodes()
+        self.node_table = pd.DataFrame(index=pd.Index(self.nodes, name='Node ID'))
+        self.community_table = None
+        self.resolution_table = None
+        self.ensemble_table = None
+        self.summary = {
+            'nodes': self.graph.number_of_nodes(),
+            'edges': self.graph.number_of_edges(),
+            'contacts': int(self.graph.size(weight='contacts')),
+            'directed': self.graph.is_directed(),
+        }
+        self.timings = {}
+        self._partition = None
+        self._labels = None
+        self._G = None
+        self._hash = None
+
+    @property
+    def G(self):
+        """The networkx graph, built on first use."""
+        if self.graph_store is not None:
+            return self.graph_store.graph()
+        if self._G is None:
+            self._G = self.graph.to_networkx()
+        return self._G
+
+    def content_hash(self):
+        """Partition cache key of the data: the edge rows, or the streamed graph itself."""
+        if self._hash is None:
+            self._hash = self.graph_store.content_hash() if self.graph_store is not None else self.graph.content_hash()
+        return self._hash
+
+    def run(self, analyses):
+        for name in analyses:
+            start = time.perf_counter()
+            getattr(self, name)()
+            self.timings[name] = round(time.perf_counter() - start, 4)
+        return self
+
+    # shared intermediate results
+
+    def partition(self):
+        if self._partition is None:
+            self._partition = self.partition_cache.get(self.graph.to_undirected(), self.content_hash(),
+                                                       self.graph.is_directed(), self.resolution, self.seed,
+                                                       refine=self.refine)
+        return self._partition
+
+    def labels(self):
+        """Community label array aligned with self.nodes, plus the community ids."""
+        if self._labels is None:
+            self._labels = partition_labels(self.partition(), self.nodes)
+        return self._labels
+
+    def exact_betweenness(self):
+        return self.betweenness_k is None and self.processes == 1
+
+    def sweep(self):
+        # the dependency accumulation is only needed when betweenness comes from the sweep
+        return shortest_path_sweep(self.G, betweenness=self.exact_betweenness())
+
+    def _community_column(self, column, values):
+        labels, community_ids = self.labels()
+        if self.community_table is None:
+            self.community_table = pd.DataFrame(
+                {'size': np.bincount(labels, minlength=len(community_ids))},
+                index=pd.Index(community_ids, name='community'))
+        self.community_table[column] = values
+
+    # analyses
+
+    def louvain(self):
+        labels, community_ids = self.labels()
+        self.node_table['community'] = np.asarray(community_ids)[labels]
+        self.summary['communities'] = len(community_ids)
+        self._community_column('size', np.bincount(labels, minlength=len(community_ids)))
+
+    def conductance(self):
+        labels, community_ids = self.labels()
+        A, _ = to_csr(self.graph, nodelist=self.nodes)
+        values = conductance_csr(A, labels, len(community_ids))
+        self._community_column('conductance', values)
+        self.summary['average_conductance'] = float(values.mean())
+
+    def coverage(self):
+        labels, community_ids = self.labels()
+        sources, targets = edge_index_arrays(self.graph, self.nodes)
+        # counted in contacts, like Social_task.calculate_community_coverage
+        values = coverage_from_edges(sources, targets, labels, len(community_ids),
+                                     edge_weight_array(self.graph, 'contacts'))
+        self._community_column('coverage', values)
+        self.summary['average_coverage'] = float(values.mean())
+
+    def modularity(self):
+        labels, community_ids = self.labels()
+        A, _ = to_csr(self.graph, nodelist=self.nodes)
+        # standard modularity, whatever resolution the partition was found at
+        values = modularity_csr(A, labels, len(community_ids), self.graph.is_directed())
+        self._community_column('modularity', values)
+        self.summary['modularity'] = float(values.sum())
+
+    def resolutions(self):
+        """Louvain at every resolution of self.sweep_resolutions: community count, modularity
+        of the partition and, with a node file, NMI against the classes."""
+        rows = []
+        for result in resolution_sweep(self.graph.to_undirected(), self.sweep_resolutions,
+                                       random_state=self.seed, refine=self.refine):
+            row = {'resolution': result['resolution'], 'communities': result['communities'],
+                   'modularity': result['modularity']}
+            if self.node_df is not None:
+                row['nmi'] = self._nmi(result['partition'])
+            rows.append(row)
+        self.resolution_table = pd.DataFrame(rows).set_index('resolution')
+
+    def ensemble(self):
+        """self.runs seeded Louvain runs (in parallel with processes): per run results and
+        pairwise NMI in ensemble_table, the consensus partition in node_table."""
+        ground_truth = None
+        if self.node_df is not None:
+            ground_truth = dict(zip(self.node_df['ID'], self.node_df['Class']))
+        result = louvain_ensemble(self.graph.to_undirected(), runs=self.runs, seed=self.seed,
+                                  resolution=self.resolution, refine=self.refine, processes=self.processes,
+                                  ground_truth=ground_truth)
+        table = pd.DataFrame({'seed': result['seeds'], 'communities': result['communities'],
+                              'modularity': result['modularity']}, index=pd.Index(range(self.runs), name='run'))
+        if ground_truth is not None:
+            table['nmi_class'] = result['class_nmi']
+            self.summary['consensus_nmi'] = result['consensus_nmi']
+        for i in range(self.runs):
+            table[f'nmi_{i}'] = result['nmi'][:, i]
+        for i in range(self.runs):
+            table[f'ari_{i}'] = result['ari'][:, i]
+        self.ensemble_table = table
+        self.node_table['consensus_community'] = pd.Series(result['consensus'])
+        off_diagonal = ~np.eye(self.runs, dtype=bool)
+        self.summary['consensus_communities'] = len(set(result['consensus'].values()))
+        if self.runs > 1:
+            self.summary['mean_pairwise_nmi'] = float(result['nmi'][off_diagonal].mean())
+            self.summary['mean_pairwise_ari'] = float(result['ari'][off_diagonal].mean())
+
+    def nmi(self):
+        if self.node_df is None:
+            raise ValueError("nmi needs the node file (--nodes)")
+        self.summary['nmi'] = self._nmi(self.partition())
+
+    def _nmi(self, partition):
+        from sklearn.metrics.cluster import normalized_mutual_info_score
+        ground_truth = dict(zip(self.node_df['ID'], self.node_df['Class']))
+        known = [node for node in self.nodes if node in ground_truth]
+        return normalized_mutual_info_score([ground_truth[node] for node in known],
+                                            [partition[node] for node in known])
+
+    def pagerank(self):
+        self.node_table['pagerank'] = pd.Series(self.link_analysis.pagerank(self.graph))
+
+    def degree(self):
+        degree = self.graph.degree()
+        n = len(degree)
+        self.node_table['degree'] = degree
+        # as nx.degree_centrality
+        self.node_table['degree_centrality'] = degree / (n - 1) if n > 1 else np.ones(n)
+
+    def closeness(self):
+        self.node_table['closeness_centrality'] = pd.Series(self.sweep()['closeness'])
+
+    def harmonic(self):
+        self.node_table['harmonic_centrality'] = pd.Series(self.sweep()['harmonic'])
+
+    def betweenness(self):
+        if self.exact_betweenness():
+            self.node_table['betweenness_centrality'] = pd.Series(self.sweep()['betweenness'])
+            return
+        centrality, error = brandes_betweenness(self.G, k=self.betweenness_k, seed=self.seed,
+                                                processes=self.processes)
+        self.node_table['betweenness_centrality'] = pd.Series(centrality)
+        if self.betweenness_k is not None:
+            self.node_table['betweenness_error'] = pd.Series(error)
+
+    def eigenvector(self):
+        self.node_table['eigenvector_centrality'] = pd.Series(self.link_analysis.eigenvector(self.graph, strict=False))
+        iterations, converged = self.link_analysis.last_run['eigenvector']
+        self.summary['eigenvector_converged'] = converged
+
+    def write(self, out_dir, table_format='csv', inputs=None):
+        """Writes summary.json and the nodes / communities tables to out_dir.
+        Returns the paths written."""
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        tables = {'nodes': self.node_table, 'communities': self.community_table,
+                  'resolutions': self.resolution_table, 'ensemble': self.ensemble_table}
+        for name, table in tables.items():
+            if table is None or table.shape[1] == 0:
+                continue
+            path = os.path.join(out_dir, f"{name}.{table_format}")
+            if table_format == 'parquet':
+                table.to_parquet(path)
+            else:
+                table.to_csv(path)
+            paths.append(path)
+        summary = dict(inputs or {}, **self.summary, timings=self.timings)
+        path = os.path.join(out_dir, "summary.json")
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2, default=_json_default)
+        paths.append(path)
+        return paths
+
+
+def _parquet_available():
+    for engine in ("pyarrow", "fastparquet"):
+        try:
+            __import__(engine)
+        except ImportError:
+            continue
+        return True
+    return False
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the network analyses without the GUI.")
+    parser.add_argument("edges", help="edge CSV file (Source, Target[, Weight])")
+    parser.add_argument("--nodes", help="node CSV file (ID, Class, Gender), needed for nmi")
+    parser.add_argument("--analyses", nargs="+", choices=ANALYSES + ['all'], default=['all'],
+                        help="analyses to run (default: all)")
+    parser.add_argument("--graph-type", choices=sorted(GRAPH_TYPES), default='undirected')
+    parser.add_argument("--out", default="results", help="output directory (default: results)")
+    parser.add_argument("--format", choices=['csv', 'parquet'], default='csv', help="format of the tables")
+    parser.add_argument("--resolution", type=float, default=DEFAULT_RESOLUTION, help="Louvain resolution")
+    parser.add_argument("--resolutions", type=float, nargs="+",
+                        help=f"resolutions of the resolutions analysis (default: {' '.join(map(str, DEFAULT_RESOLUTIONS))})")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Louvain runs of the ensemble analysis")
+    parser.add_argument("--leiden", action="store_true", help="add the Leiden refinement step to Louvain")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Louvain and sampling seed")
+    parser.add_argument("--betweenness-k", type=int, help="sample k sources for betweenness")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes for betweenness and the ensemble (0 uses every core)")
+    parser.add_argument("--memory-mb", type=int, nargs="?", const=DEFAULT_MEMORY_MB,
+                        help="stream the edge file in chunks into a memory-mapped graph, holding about "
+                             f"this many MB while reading (default: {DEFAULT_MEMORY_MB})")
+    parser.add_argument("--csr-dir", help="where --memory-mb keeps the graph (default: OUT/csr), reused "
+                                          "while the edge file is unchanged")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    analyses = ANALYSES if 'all' in args.analyses else args.analyses
+    if args.format == 'parquet' and not _parquet_available():
+        sys.exit("--format parquet needs pyarrow or fastparquet installed")
+    if 'nmi' in analyses and not args.nodes:
+        if 'all' not in args.analyses:
+            sys.exit("nmi needs the node file (--nodes)")
+        analyses = [name for name in analyses if name != 'nmi']
+    node_df = read_node_csv(args.nodes) if args.nodes else None
+    edge_df, graph = None, None
+    start = time.perf_counter()
+    if args.memory_mb:
+        graph = ingest_edges(args.edges, args.csr_dir or os.path.join(args.out, "csr"),
+                             directed=args.graph_type == 'directed', memory_mb=args.memory_mb)
+    else:
+        edge_df = read_edge_csv(args.edges)
+    load_seconds = round(time.perf_counter() - start, 4)
+    batch = BatchAnalysis(edge_df, node_df, GRAPH_TYPES[args.graph_type],
+                          resolution=args.resolution, seed=args.seed, betweenness_k=args.betweenness_k,
+                          processes=args.processes or None, refine=args.leiden, resolutions=args.resolutions,
+                          runs=args.runs, graph=graph)
+    batch.timings['load'] = load_seconds
+    batch.run(analyses)
+    inputs = {'edges_file': args.edges, 'nodes_file': args.nodes, 'analyses': analyses,
+              'method': 'leiden' if args.leiden else 'louvain', 'memory_mb': args.memory_mb}
+    for path in batch.write(args.out, args.format, inputs):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
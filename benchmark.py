@@ -0,0 +1,286 @@
+"""Benchmark suite: times every analysis stage on the bundled primaryschool edge files and
+on generated planted-partition (stochastic block model) or LFR graphs of 10^3 .. 10^6
+edges, and appends wall time and peak memory to a JSON history so regressions between
+versions show up in the comparison printed after each run.
+
+    python benchmark.py                          # bundled files + SBM 1e3 .. 1e6 edges
+    python benchmark.py --scales 1e3 1e4 --generator lfr --stages best_partition pagerank
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from sklearn.metrics.cluster import normalized_mutual_info_score
+
+from centrality import brandes_betweenness, forget_sweep, shortest_path_sweep
+from community_metrics import calculate_conductance, community_coverage, partition_modularity
+from edge_io import read_edge_csv, read_node_csv
+from graph_store import GraphStore
+from layout import force_layout
+from link_analysis import LinkAnalysis
+from louvain import best_partition
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUNDLED = {
+    'school': "primaryschool_Edges .csv",
+    'school-weighted': "primaryschool_Edges (Weighted Graph).csv",
+}
+NODE_FILE = "metadata_primaryschool_Nodes.csv"
+DEFAULT_SCALES = [1e3, 1e4, 1e5, 1e6]
+# local to each checkout (ignored by git): timings only compare on the same machine
+DEFAULT_HISTORY = os.path.join(HERE, "benchmarks", "benchmark_history.json")
+SEED = 42
+
+
+def planted_partition_edges(n_edges, average_degree=10, block_size=100, mixing=0.2, seed=SEED):
+    """Edge list of a planted-partition stochastic block model with about n_edges edges:
+    blocks of block_size nodes, every edge leaving its block with probability mixing.
+    Returns (edge_df, {node: block})."""
+    rng = np.random.default_rng(seed)
+    n = max(int(2 * n_edges / average_degree), block_size)
+    sources = rng.integers(0, n, int(n_edges))
+    block = sources // block_size
+    inside = block * block_size + rng.integers(0, block_size, len(sources))
+    targets = np.where(rng.random(len(sources)) < mixing, rng.integers(0, n, len(sources)), np.minimum(inside, n - 1))
+    keep = sources != targets
+    edge_df = pd.DataFrame({"Source": sources[keep].astype(np.int32), "Target": targets[keep].astype(np.int32)})
+    return edge_df, {node: node // block_size for node in range(n)}
+
+
+def lfr_edges(n_edges, average_degree=10, mixing=0.2, seed=SEED):
+    """Edge list of an LFR benchmark graph (power-law degrees and community sizes) with
+    about n_edges edges. networkx generates it in pure Python, so it is slow past 10^5
+    edges and may fail to converge for some sizes."""
+    n = max(int(2 * n_edges / average_degree), 250)
+    G = nx.LFR_benchmark_graph(n, 2.5, 1.5, mixing, average_degree=average_degree, min_community=20,
+                               max_degree=max(50, average_degree * 5), seed=seed)
+    G.remove_edges_from(nx.selfloop_edges(G))
+    edges = np.array(G.edges(), dtype=np.int32).reshape(-1, 2)
+    ground_truth = {node: min(G.nodes[node]['community']) for node in G}
+    return pd.DataFrame({"Source": edges[:, 0], "Target": edges[:, 1]}), ground_truth
+
+
+def datasets(scales, generator, bundled=True):
+    """Yields (name, edge_file or None, loader) where loader() returns (edge_df, ground_truth)."""
+    if bundled:
+        classes = read_node_csv(os.path.join(HERE, NODE_FILE))
+        ground_truth = dict(zip(classes['ID'], classes['Class']))
+        for name, filename in BUNDLED.items():
+            path = os.path.join(HERE, filename)
+            yield name, path, lambda path=path: (read_edge_csv(path, use_cache=False), ground_truth)
+    make = lfr_edges if generator == 'lfr' else planted_partition_edges
+    for scale in scales:
+        yield f"{generator}-{int(scale):.0e}".replace("+0", ""), None, lambda scale=scale: make(int(scale))
+
+
+class Context:
+    """What the stages of one dataset share: the edge data, graphs and partition."""
+
+    def __init__(self, edge_df, ground_truth, edge_file=None):
+        self.edge_file = edge_file
+        self.edge_df = edge_df
+        self.ground_truth = ground_truth
+        store = GraphStore()
+        store.load_edges(edge_df)
+        store.set_graph_type('Undirect Graph')
+        self.G = store.graph()
+        self.partition = None
+
+
+def _read_csv(ctx):
+    return read_edge_csv(ctx.edge_file, use_cache=False)
+
+
+def _build_graph(ctx):
+    store = GraphStore()
+    store.load_edges(ctx.edge_df)
+    store.set_graph_type('Undirect Graph')
+    return store.graph()
+
+
+def _build_csr(ctx):
+    store = GraphStore()
+    store.load_edges(ctx.edge_df)
+    store.set_graph_type('Undirect Graph')
+    return store.csr()
+
+
+def _best_partition(ctx):
+    ctx.partition = best_partition(ctx.G, random_state=SEED)
+    return ctx.partition
+
+
+def _nmi(ctx):
+    known = [node for node in ctx.G if node in ctx.ground_truth]
+    return normalized_mutual_info_score([ctx.ground_truth[node] for node in known],
+                                        [ctx.partition[node] for node in known])
+
+
+def _sweep(ctx):
+    forget_sweep(ctx.G)  # time the sweep itself, not the per-graph cache
+    return shortest_path_sweep(ctx.G)
+
+
+# name -> (function, None or the option holding the largest graph it runs on)
+STAGES = {
+    'read_csv': (_read_csv, None),
+    'build_graph': (_build_graph, None),
+    'build_csr': (_build_csr, None),
+    'best_partition': (_best_partition, None),
+    'conductance': (lambda ctx: calculate_conductance(ctx.G, ctx.partition), None),
+    'coverage': (lambda ctx: community_coverage(ctx.G, ctx.partition, weight="contacts"), None),
+    'modularity': (lambda ctx: partition_modularity(ctx.G, ctx.partition), None),
+    'nmi': (_nmi, None),
+    'pagerank': (lambda ctx: LinkAnalysis().pagerank(ctx.G, warm_start=False), None),
+    'degree': (lambda ctx: nx.degree_centrality(ctx.G), None),
+    # closeness, harmonic and exact betweenness all come from this one sweep
+    'shortest_path_sweep': (_sweep, 'max_sweep_nodes'),
+    'betweenness_sampled': (lambda ctx: brandes_betweenness(ctx.G, k=100, seed=SEED), 'max_sampled_nodes'),
+    'eigenvector': (lambda ctx: LinkAnalysis().eigenvector(ctx.G, warm_start=False, strict=False), None),
+    # the layout the GUI draws with, and the networkx one it replaced
+    'force_layout': (lambda ctx: force_layout(ctx.G, seed=SEED), 'max_layout_nodes'),
+    'spring_layout': (lambda ctx: nx.spring_layout(ctx.G, seed=SEED), 'max_spring_nodes'),
+}
+
+
+def measure(func, ctx, repeat=1, memory=True):
+    """Best wall time of repeat calls and, with memory, the peak traced allocation (MB)
+    of one extra call. Memory is traced in its own call because tracemalloc slows
+    Python-heavy code down several times."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(ctx)
+        seconds.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func(ctx)
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return min(seconds), peak
+
+
+def run(args):
+    limits = {'max_sweep_nodes': args.max_sweep_nodes, 'max_sampled_nodes': args.max_sampled_nodes,
+              'max_layout_nodes': args.max_layout_nodes, 'max_spring_nodes': args.max_spring_nodes}
+    stages = args.stages or list(STAGES)
+    results = []
+    for name, edge_file, loader in datasets(args.scales, args.generator, not args.no_bundled):
+        edge_df, ground_truth = loader()
+        ctx = Context(edge_df, ground_truth, edge_file)
+        n, m = ctx.G.number_of_nodes(), ctx.G.number_of_edges()
+        print(f"{name}: {n} nodes, {m} edges")
+        if any(stage in stages for stage in ('conductance', 'coverage', 'modularity', 'nmi')) \
+                and 'best_partition' not in stages:
+            _best_partition(ctx)
+        for stage in stages:
+            func, limit = STAGES[stage]
+            if stage == 'read_csv' and edge_file is None:
+                continue
+            if limit is not None and n > limits[limit]:
+                print(f"  {stage:<20} skipped (more than {limits[limit]} nodes)")
+                continue
+            seconds, peak = measure(func, ctx, args.repeat, not args.no_memory)
+            memory = "" if peak is None else f"{peak:10.1f} MB"
+            print(f"  {stage:<20} {seconds:10.4f} s {memory}")
+            results.append({'dataset': name, 'nodes': n, 'edges': m, 'stage': stage,
+                            'seconds': round(seconds, 6), 'peak_mb': None if peak is None else round(peak, 3)})
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'networkx': nx.__version__,
+        'pandas': pd.__version__,
+        'machine': f"{platform.system()} {platform.machine()}, {os.cpu_count()} cpu",
+    }
+
+
+def load_history(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def compare(results, history, threshold):
+    """Prints every stage next to its time in the latest earlier run that has it and
+    flags those slower by more than threshold (a ratio)."""
+    previous = {}
+    for record in history:
+        for result in record['results']:
+            previous[result['dataset'], result['stage']] = (result['seconds'], record.get('commit'))
+    regressions = 0
+    print(f"\n{'dataset':<18}{'stage':<22}{'before':>10}{'now':>10}{'ratio':>8}")
+    for result in results:
+        key = result['dataset'], result['stage']
+        if key not in previous:
+            continue
+        before, commit = previous[key]
+        ratio = result['seconds'] / before if before else float('inf')
+        # sub-millisecond stages are too noisy to flag
+        slower = ratio > threshold and result['seconds'] > 1e-3
+        regressions += slower
+        print(f"{key[0]:<18}{key[1]:<22}{before:10.4f}{result['seconds']:10.4f}{ratio:8.2f}"
+              + (f"  slower than {commit}" if slower else ""))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time the analysis stages and keep a JSON history.")
+    parser.add_argument("--scales", type=float, nargs="+", default=DEFAULT_SCALES,
+                        help="edge counts of the generated graphs (default: 1e3 1e4 1e5 1e6)")
+    parser.add_argument("--generator", choices=['sbm', 'lfr'], default='sbm', help="generated graph model")
+    parser.add_argument("--no-bundled", action="store_true", help="skip the bundled primaryschool files")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="stages to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="timed calls per stage, the best one is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak memory call")
+    parser.add_argument("--max-sweep-nodes", type=int, default=5000,
+                        help="largest graph for the all-pairs shortest path sweep")
+    parser.add_argument("--max-sampled-nodes", type=int, default=50000,
+                        help="largest graph for sampled betweenness")
+    parser.add_argument("--max-layout-nodes", type=int, default=20000, help="largest graph for force_layout")
+    parser.add_argument("--max-spring-nodes", type=int, default=2000, help="largest graph for nx.spring_layout")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    history = load_history(args.history)
+    regressions = compare(results, history, args.threshold)
+    print(f"\n{regressions} stage(s) slower than the previous run by more than {args.threshold}x")
+    if not args.no_save:
+        history.append(dict(environment(), results=results))
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=1)
+        print(f"saved to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import heapq
+import os
+import random
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import networkx as nx
+import numpy as np
+
+
+def _dependency_vector(G, sources, nodes, weight):
+    values = nx.betweenness_centrality_subset(G, sources, nodes, normalized=False, weight=weight)
+    return np.fromiter((values[node] for node in nodes), dtype=np.float64, count=len(nodes))
+
+
+def _betweenness_chunk(G, sources, weight, with_squares=False):
+    """Sums the Brandes dependency vectors of sources. with_squares also sums their
+    squares source by source (needed for the error estimate of the sampled mode)."""
+    nodes = list(G)
+    if not with_squares:
+        return _dependency_vector(G, sources, nodes, weight), None
+    total = np.zeros(len(nodes))
+    total_sq = np.zeros(len(nodes))
+    for source in sources:
+        dependency = _dependency_vector(G, [source], nodes, weight)
+        total += dependency
+        total_sq += dependency ** 2
+    return total, total_sq
+
+
+# graph, sources, weight and mode of a betweenness pool worker, set once per process by
+# _init_betweenness_worker so tasks only carry the chunk number
+_worker_state = None
+
+
+def _init_betweenness_worker(G, sources, weight, with_squares):
+    global _worker_state
+    _worker_state = (G, sources, weight, with_squares)
+
+
+def _betweenness_worker_chunk(index, n_chunks):
+    """Chunk index of n_chunks of the worker's sources (every n_chunks-th one, as in _split)."""
+    G, sources, weight, with_squares = _worker_state
+    return _betweenness_chunk(G, sources[index::n_chunks], weight, with_squares)
+
+
+def _split(items, n_chunks):
+    n_chunks = max(1, min(n_chunks, len(items)))
+    return [items[i::n_chunks] for i in range(n_chunks)]
+
+
+def brandes_betweenness(G, k=None, seed=None, processes=1, weight=None, normalized=True, progress=None):
+    """Betweenness centrality with optional parallelism and source sampling.
+
+    processes > 1 splits the source nodes across a process pool and sums the partial
+    dependency vectors (None uses every core). With k, only k randomly chosen sources
+    are used and the result is scaled by n/k, as in nx.betweenness_centrality.
+    progress(fraction) is called as source chunks complete and may raise to abort.
+
+    Returns (centrality, error) where error[node] is the standard error of the
+    sampled estimate (all zeros for the exact computation)."""
+    nodes = list(G)
+    n = len(nodes)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if k is not None and k >= n:
+        k = None  # sampling every node is the exact computation
+    if k is None and processes <= 1:
+        centrality = nx.betweenness_centrality(G, normalized=normalized, weight=weight)
+        return centrality, dict.fromkeys(nodes, 0.0)
+
+    sampled = k is not None
+    sources = nodes if not sampled else random.Random(seed).sample(nodes, k)
+    total = np.zeros(n)
+    total_sq = np.zeros(n)
+
+    def add(chunk_result, done, n_chunks):
+        chunk_total, chunk_sq = chunk_result
+        total[:] += chunk_total
+        if chunk_sq is not None:
+            total_sq[:] += chunk_sq
+        if progress is not None:
+            progress(done / n_chunks)
+
+    if processes <= 1:
+        chunks = _split(sources, 20)
+        for done, chunk in enumerate(chunks, 1):
+            add(_betweenness_chunk(G, chunk, weight, sampled), done, len(chunks))
+    else:
+        # several chunks per worker keeps the pool busy and makes cancelling quick; the
+        # graph is pickled once per worker, the tasks only carry chunk numbers
+        n_chunks = max(1, min(processes * 4, len(sources)))
+        pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_betweenness_worker,
+                                   initargs=(G, sources, weight, sampled))
+        try:
+            futures = [pool.submit(_betweenness_worker_chunk, index, n_chunks) for index in range(n_chunks)]
+            for done, future in enumerate(as_completed(futures), 1):
+                add(future.result(), done, n_chunks)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # betweenness_centrality_subset already halves undirected values
+    scale = 1.0
+    if normalized and n > 2:
+        scale = (1 if G.is_directed() else 2) / ((n - 1) * (n - 2))
+    error = np.zeros(n)
+    if sampled:
+        mean = total / k
+        variance = np.maximum(total_sq / k - mean ** 2, 0) * k / max(k - 1, 1)
+        # standard error of n * mean, with the finite population correction
+        error = n * np.sqrt(variance / k * (1 - k / n))
+        total = total * n / k
+    return dict(zip(nodes, total * scale)), dict(zip(nodes, error * scale))
+
+
+# sweep results per graph object and weight, dropped when the graph is garbage collected
+_sweep_cache = weakref.WeakKeyDictionary()
+
+
+def _bfs_paths(adj, source, n):
+    """Unweighted single-source shortest paths: visiting order, predecessors, path counts
+    and distances, as needed by Brandes' accumulation."""
+    order = []
+    preds = [[] for _ in range(n)]
+    sigma = [0] * n
+    dist = [-1] * n
+    sigma[source] = 1
+    dist[source] = 0
+    queue = [source]
+    for v in queue:  # the list grows while it is scanned, so it acts as the BFS queue
+        order.append(v)
+        dv = dist[v] + 1
+        for w in adj[v]:
+            if dist[w] < 0:
+                dist[w] = dv
+                queue.append(w)
+            if dist[w] == dv:
+                sigma[w] += sigma[v]
+                preds[w].append(v)
+    return order, preds, sigma, dist
+
+
+def _bfs_distances(adj, source, n):
+    """_bfs_paths without the predecessors and path counts, for closeness and harmonic
+    centrality alone."""
+    dist = [-1] * n
+    dist[source] = 0
+    queue = [source]
+    for v in queue:
+        dv = dist[v] + 1
+        for w in adj[v]:
+            if dist[w] < 0:
+                dist[w] = dv
+                queue.append(w)
+    return queue, None, None, dist
+
+
+def _dijkstra_paths(adj, source, n):
+    """Weighted counterpart of _bfs_paths (adj holds (neighbor, weight) pairs)."""
+    order = []
+    preds = [[] for _ in range(n)]
+    sigma = [0] * n
+    dist = [-1] * n
+    seen = {source: 0}
+    sigma[source] = 1
+    heap = [(0, 0, source, source)]
+    counter = 1
+    while heap:
+        d, _, pred, v = heapq.heappop(heap)
+        if dist[v] >= 0:
+            continue  # already settled
+        sigma[v] += sigma[pred] if pred != v else 0
+        order.append(v)
+        dist[v] = d
+        for w, weight in adj[v]:
+            vw_dist = d + weight
+            if dist[w] < 0 and (w not in seen or vw_dist < seen[w]):
+                seen[w] = vw_dist
+                heapq.heappush(heap, (vw_dist, counter, v, w))
+                counter += 1
+                sigma[w] = 0
+                preds[w] = [v]
+            elif vw_dist == seen.get(w):
+                sigma[w] += sigma[v]
+                preds[w].append(v)
+    return order, preds, sigma, dist
+
+
+def forget_sweep(G):
+    """Drops the cached sweep of G, needed after G was modified in place."""
+    if G is not None:
+        _sweep_cache.pop(G, None)
+
+
+def shortest_path_sweep(G, weight=None, progress=None, betweenness=True):
+    """Closeness, harmonic and betweenness centrality from a single set of traversals.
+
+    Runs one BFS (or Dijkstra when weight is given) per source and accumulates the
+    inward distances for closeness and harmonic centrality and the Brandes
+    dependencies for betweenness in the same pass. Values match networkx's
+    closeness_centrality, harmonic_centrality and betweenness_centrality (normalized).
+    betweenness=False skips the dependency accumulation (and, unweighted, the path
+    counting), for callers that get betweenness from brandes_betweenness instead.
+    The result is cached per graph object; G must not be modified afterwards.
+
+    Returns {'closeness': {...}, 'harmonic': {...}, 'betweenness': {...}}, without
+    'betweenness' when betweenness=False."""
+    per_graph = _sweep_cache.setdefault(G, {})
+    if weight in per_graph:
+        return per_graph[weight]  # a full sweep also serves betweenness=False
+    key = weight if betweenness else ('distances', weight)
+    if key in per_graph:
+        return per_graph[key]
+
+    nodes = list(G)
+    n = len(nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    if weight is None:
+        adj = [[index[v] for v in G[u]] for u in nodes]
+        paths = _bfs_paths if betweenness else _bfs_distances
+    else:
+        adj = [[(index[v], data.get(weight, 1)) for v, data in G[u].items()] for u in nodes]
+        paths = _dijkstra_paths
+
+    distance_sum = [0.0] * n
+    reached_by = [0] * n
+    harmonic = [0.0] * n
+    dependency = [0.0] * n
+    step = max(1, n // 100)
+    for source in range(n):
+        order, preds, sigma, dist = paths(adj, source, n)
+        # closeness and harmonic use distances *to* each node, as networkx does for digraphs
+        for v in order[1:]:
+            d = dist[v]
+            distance_sum[v] += d
+            reached_by[v] += 1
+            harmonic[v] += 1 / d
+        if not betweenness:
+            if progress is not None and source % step == 0:
+                progress(source / n)
+            continue
+        delta = [0.0] * n
+        for w in reversed(order):
+            coefficient = (1 + delta[w]) / sigma[w]
+            for v in preds[w]:
+                delta[v] += sigma[v] * coefficient
+            if w != source:
+                dependency[w] += delta[w]
+        if progress is not None and source % step == 0:
+            progress(source / n)
+
+    closeness = [0.0] * n
+    for v in range(n):
+        if distance_sum[v] > 0 and n > 1:
+            # Wasserman and Faust scaling for disconnected graphs (wf_improved=True)
+            closeness[v] = reached_by[v] / distance_sum[v] * reached_by[v] / (n - 1)
+    scale = 1 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+
+    result = {
+        'closeness': dict(zip(nodes, closeness)),
+        'harmonic': dict(zip(nodes, harmonic)),
+    }
+    if betweenness:
+        result['betweenness'] = {node: value * scale for node, value in zip(nodes, dependency)}
+    per_graph[key] = result
+    return result
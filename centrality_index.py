@@ -0,0 +1,174 @@
+import re
+import weakref
+
+import numpy as np
+import pandas as pd
+
+OPERATORS = ('>=', '<=', '>', '<')
+
+# one index per graph object, dropped when the graph is garbage collected
+_index_cache = weakref.WeakKeyDictionary()
+
+
+class CentralityIndex:
+    """Centrality scores of one graph, each measure stored once as an array aligned
+    with nodes plus its ascending sort order.
+
+    Threshold, top-k and percentile queries are binary searches / slices on the
+    sorted values, so changing the threshold does not recompute or re-sort anything.
+    A condition is (measure, op, value) with op one of >=, >, <=, < or 'top' (value
+    is k) or 'pct' (value is a percentile, nodes at or above it)."""
+
+    def __init__(self, nodes):
+        self.nodes = np.asarray(list(nodes))
+        self._position = {node: i for i, node in enumerate(self.nodes.tolist())}
+        self._values = {}
+        self._order = {}
+        self._sorted = {}
+        self._info = {}
+
+    @property
+    def measures(self):
+        return list(self._values)
+
+    def __contains__(self, measure):
+        return measure in self._values
+
+    def has(self, measure, source=None):
+        """True when measure is stored and was computed by the same source (e.g. the
+        betweenness mode and sample size), so it does not need recomputing."""
+        return measure in self._values and self._info[measure]['source'] == source
+
+    def add(self, measure, scores, error=None, note=None, source=None):
+        """Stores scores ({node: value} or an array aligned with nodes). error holds
+        per-node standard errors of a sampled estimate and note a message about how
+        the scores were obtained (e.g. a non-converged iteration)."""
+        values = self._aligned(scores)
+        order = np.argsort(values, kind='stable')
+        self._values[measure] = values
+        self._order[measure] = order
+        self._sorted[measure] = values[order]
+        self._info[measure] = {'error': None if error is None else self._aligned(error), 'note': note,
+                               'source': source}
+
+    def _aligned(self, scores):
+        if isinstance(scores, dict):
+            return np.fromiter((scores[node] for node in self.nodes.tolist()), dtype=np.float64,
+                               count=len(self.nodes))
+        return np.asarray(scores, dtype=np.float64)
+
+    def values(self, measure):
+        return self._values[measure]
+
+    def note(self, measure):
+        return self._info[measure]['note']
+
+    def error(self, measure):
+        return self._info[measure]['error']
+
+    def select(self, measure, op='>=', value=0):
+        """Positions (into nodes) of the nodes satisfying one condition, highest score first."""
+        order, ranked = self._order[measure], self._sorted[measure]
+        if op == 'top':
+            return order[::-1][:max(int(value), 0)]
+        if op == 'pct':
+            value = self.percentile(measure, value)
+            op = '>='
+        if op in ('>=', '>'):
+            start = np.searchsorted(ranked, value, side='left' if op == '>=' else 'right')
+            return order[start:][::-1]
+        if op in ('<=', '<'):
+            stop = np.searchsorted(ranked, value, side='right' if op == '<=' else 'left')
+            return order[:stop][::-1]
+        raise ValueError(f"unknown operator {op!r}")
+
+    def percentile(self, measure, q):
+        """Score at the q-th percentile (0-100), read off the sorted values."""
+        ranked = self._sorted[measure]
+        if not len(ranked):
+            return np.inf
+        q = min(max(float(q), 0.0), 100.0)
+        return ranked[int(np.floor(q / 100 * (len(ranked) - 1)))]
+
+    def where(self, conditions, order_by=None):
+        """Positions of the nodes satisfying every condition, sorted by order_by
+        (default the measure of the first condition), highest first."""
+        if not conditions:
+            return np.arange(len(self.nodes))
+        order_by = order_by or conditions[0][0]
+        selected = [self.select(*condition) for condition in conditions]
+        if len(selected) == 1 and order_by == conditions[0][0]:
+            return selected[0]
+        mask = np.ones(len(self.nodes), dtype=bool)
+        for positions in selected:
+            condition_mask = np.zeros(len(self.nodes), dtype=bool)
+            condition_mask[positions] = True
+            mask &= condition_mask
+        positions = np.flatnonzero(mask)
+        return positions[np.argsort(-self._values[order_by][positions], kind='stable')]
+
+    def table(self, positions, measures, digits=3):
+        """DataFrame of the given nodes (in order) with a column per measure, plus
+        std_error for measures stored with an error."""
+        df = pd.DataFrame(index=pd.Index(self.nodes[positions], name='Node ID'))
+        for measure in measures:
+            df[measure] = self._values[measure][positions].round(digits)
+            error = self._info[measure]['error']
+            if error is not None:
+                df['std_error'] = error[positions].round(digits + 1)
+        return df
+
+    def resolve(self, name):
+        """Full measure name for a name or unique prefix typed by the user."""
+        if name in self._values:
+            return name
+        matches = [measure for measure in self._values if measure.startswith(name)]
+        if len(matches) != 1:
+            known = ", ".join(self._values) or "none computed yet"
+            raise ValueError(f"unknown measure {name!r} (available: {known})")
+        return matches[0]
+
+
+def centrality_index(G):
+    """Returns the CentralityIndex of G. It is rebuilt when G gained nodes or edges in
+    place (e.g. GraphStore.append_edges), since every measure may have changed."""
+    stamp = (G.number_of_nodes(), G.number_of_edges())
+    cached = _index_cache.get(G)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, CentralityIndex(G.nodes()))
+        _index_cache[G] = cached
+    return cached[1]
+
+
+_CONDITION = re.compile(r'^\s*([A-Za-z_]+)\s*(>=|<=|>|<)\s*(\S+)\s*$')
+_TOP = re.compile(r'^\s*top\s+(\d+)\s*$', re.IGNORECASE)
+_PERCENTILE = re.compile(r'^\s*(?:p\s*)?(\d+(?:\.\d+)?)\s*%\s*$|^\s*p\s*(\d+(?:\.\d+)?)\s*$', re.IGNORECASE)
+
+
+def parse_query(text, measure, index=None):
+    """Turns the filter text typed by the user into conditions on measure.
+
+    Accepts a plain number (scores >= it, as before), "top 10", "90%" / "p90"
+    (at or above the 90th percentile) and comparisons on any stored measure joined
+    with "and", e.g. "betweenness > 0.01 and degree > 0.3"."""
+    text = (text or "").strip()
+    if not text:
+        return [(measure, '>=', 0.0)]
+    conditions = []
+    for part in re.split(r'\s+and\s+|\s*&\s*', text, flags=re.IGNORECASE):
+        top = _TOP.match(part)
+        percentile = _PERCENTILE.match(part)
+        comparison = _CONDITION.match(part)
+        if top:
+            conditions.append((measure, 'top', int(top.group(1))))
+        elif percentile:
+            conditions.append((measure, 'pct', float(percentile.group(1) or percentile.group(2))))
+        elif comparison:
+            name, op, value = comparison.groups()
+            name = index.resolve(name) if index is not None else name
+            conditions.append((name, op, float(value)))
+        else:
+            conditions.append((measure, '>=', float(part)))
+    # the measure of the button drives the ordering, keep a condition on it first
+    conditions.sort(key=lambda condition: condition[0] != measure)
+    return conditions
@@ -0,0 +1,163 @@
+import networkx as nx
+import numpy as np
+
+from csr_graph import CSRGraph
+
+
+def to_csr(G, weight='weight', nodelist=None):
+    """Returns the adjacency of G as a CSR matrix (rows are edge sources) and its node order.
+
+    Missing weights count as 1. Parallel edges of a MultiGraph count once, like the
+    per-neighbor loops this module replaces. A CSRGraph hands over its own arrays."""
+    if isinstance(G, CSRGraph):
+        return G.to_scipy(weight, nodelist), G.nodes() if nodelist is None else nodelist
+    if nodelist is None:
+        nodelist = list(G.nodes())
+    A = nx.to_scipy_sparse_array(G, nodelist=nodelist, weight=weight, format='csr', dtype=np.float64)
+    if G.is_multigraph():
+        A.data[:] = 1
+    return A, nodelist
+
+
+def partition_labels(partition, nodes):
+    """Maps a {node: community} partition onto an integer label array aligned with nodes.
+
+    Returns (labels, community_ids) where labels[i] indexes into community_ids."""
+    community_ids = list(set(partition.values()))
+    try:
+        community_ids.sort()
+    except TypeError:
+        community_ids.sort(key=str)  # mixed label types
+    index = {c: i for i, c in enumerate(community_ids)}
+    labels = np.fromiter((index[partition[node]] for node in nodes), dtype=np.int64, count=len(nodes))
+    return labels, community_ids
+
+
+def conductance_csr(A, labels, n_communities=None):
+    """Vectorized conductance of every community in one pass over the CSR arrays.
+
+    Each stored entry (i, j, w) adds w to the internal weight of labels[i] when both
+    endpoints share a community and to its cut weight otherwise. Undirected graphs
+    store both directions, so internal edges count twice exactly as in the
+    node-by-node definition 2*Eoc / (2*Ec + Eoc)."""
+    if n_communities is None:
+        n_communities = int(labels.max()) + 1 if len(labels) else 0
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    source_labels = labels[rows]
+    internal = source_labels == labels[A.indices]
+    Ec = np.bincount(source_labels[internal], weights=A.data[internal], minlength=n_communities)
+    Eoc = np.bincount(source_labels[~internal], weights=A.data[~internal], minlength=n_communities)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conductance = 2 * Eoc / (2 * Ec + Eoc)
+    conductance[Ec == 0] = 1
+    return conductance
+
+
+def calculate_conductance(G, partition, weight='weight'):
+    """Calculates the conductance of each community
+    and returns the conductance values for each community."""
+    A, nodes = to_csr(G, weight=weight)
+    labels, community_ids = partition_labels(partition, nodes)
+    values = conductance_csr(A, labels, len(community_ids))
+    return {f"community {c} : conductance": float(value) for c, value in zip(community_ids, values)}
+
+
+def modularity_csr(A, labels, n_communities=None, directed=False, resolution=1.0):
+    """Contribution of every community to the modularity, from the CSR adjacency (rows
+    are edge sources, as from to_csr); the modularity is their sum.
+
+    Undirected: L_c / m - resolution * (d_c / 2m)^2 with L_c the weight inside c and d_c
+    its degree sum, where a self-loop is stored once but counts twice in the degree.
+    Directed: L_c / m - resolution * out_c * in_c / m^2, as in networkx."""
+    if n_communities is None:
+        n_communities = int(labels.max()) + 1 if len(labels) else 0
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    source_labels = labels[rows]
+    internal = source_labels == labels[A.indices]
+    inside = np.bincount(source_labels[internal], weights=A.data[internal], minlength=n_communities)
+    m = A.data.sum() if directed else (A.data.sum() + A.diagonal().sum()) / 2
+    if m == 0:
+        return np.zeros(n_communities)
+    if directed:
+        out_weight = np.bincount(source_labels, weights=A.data, minlength=n_communities)
+        in_weight = np.bincount(labels[A.indices], weights=A.data, minlength=n_communities)
+        expected = out_weight * in_weight / m ** 2
+    else:
+        loops = A.diagonal()
+        # stored entries count every edge twice except self-loops
+        inside = (inside + np.bincount(labels, weights=loops, minlength=n_communities)) / 2
+        degrees = np.bincount(source_labels, weights=A.data, minlength=n_communities) \
+            + np.bincount(labels, weights=loops, minlength=n_communities)
+        expected = (degrees / (2 * m)) ** 2
+    return inside / m - resolution * expected
+
+
+def partition_modularity(G, partition, weight='weight', resolution=1.0, per_community=False):
+    """Modularity of a given {node: community} partition of G (directed graphs use the
+    directed definition). With per_community=True returns (modularity,
+    {community: contribution})."""
+    A, nodes = to_csr(G, weight=weight)
+    labels, community_ids = partition_labels(partition, nodes)
+    values = modularity_csr(A, labels, len(community_ids), G.is_directed(), resolution)
+    modularity = float(values.sum())
+    if per_community:
+        return modularity, {c: float(value) for c, value in zip(community_ids, values)}
+    return modularity
+
+
+def edge_index_arrays(G, nodes):
+    """Returns (sources, targets) integer index arrays of every edge of G, one entry per
+    parallel edge of a MultiGraph, with indices into nodes."""
+    if isinstance(G, CSRGraph):
+        sources, targets = G.edge_arrays()
+        positions = np.arange(len(nodes))
+        if not np.array_equal(np.asarray(nodes, dtype=G.node_ids.dtype), G.node_ids):
+            positions = np.empty(len(nodes), dtype=np.int64)
+            positions[G.index_of(nodes)] = np.arange(len(nodes))
+        return positions[sources], positions[targets]
+    index = {node: i for i, node in enumerate(nodes)}
+    m = G.number_of_edges()
+    sources = np.fromiter((index[u] for u, v in G.edges()), dtype=np.int64, count=m)
+    targets = np.fromiter((index[v] for u, v in G.edges()), dtype=np.int64, count=m)
+    return sources, targets
+
+
+def edge_weight_array(G, weight):
+    """Array of the weight attribute of every edge, aligned with edge_index_arrays;
+    edges without it count as 1. None when weight is None."""
+    if weight is None:
+        return None
+    if isinstance(G, CSRGraph):
+        return G.edge_weights(weight)
+    return np.fromiter((w for u, v, w in G.edges(data=weight, default=1)), dtype=np.float64,
+                       count=G.number_of_edges())
+
+
+def coverage_from_edges(sources, targets, labels, n_communities=None, weights=None):
+    """Coverage of every community in one pass over the edge list.
+
+    Edges whose endpoints share a label are bucketed as intra-community edges of that
+    label; the degree sum of a community is the number of edge endpoints it owns
+    (a self-loop counts twice, as in G.degree). Optional weights count each edge
+    that many times, e.g. the 'contacts' multiplicity of an aggregated graph."""
+    if n_communities is None:
+        n_communities = int(labels.max()) + 1 if len(labels) else 0
+    source_labels = labels[sources]
+    target_labels = labels[targets]
+    internal = source_labels == target_labels
+    internal_weights = None if weights is None else weights[internal]
+    internal_edges = np.bincount(source_labels[internal], weights=internal_weights, minlength=n_communities)
+    total_edges = (np.bincount(source_labels, weights=weights, minlength=n_communities)
+                   + np.bincount(target_labels, weights=weights, minlength=n_communities))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return internal_edges / total_edges
+
+
+def community_coverage(G, partition, weight=None):
+    """Returns {community: coverage}, the number of edges inside the community divided
+    by the total degree of its nodes (both counted with the weight attribute if given)."""
+    nodes = list(G.nodes())
+    labels, community_ids = partition_labels(partition, nodes)
+    sources, targets = edge_index_arrays(G, nodes)
+    values = coverage_from_edges(sources, targets, labels, len(community_ids), edge_weight_array(G, weight))
+    return {c: float(value) for c, value in zip(community_ids, values)}
@@ -0,0 +1,242 @@
+import hashlib
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+def index_dtype(nnz):
+    """indptr dtype for nnz stored entries: int32 like the indices while it fits, so
+    scipy uses the arrays as they are instead of upcasting both to int64."""
+    return np.int32 if nnz < 2 ** 31 else np.int64
+
+
+class CSRGraph:
+    """Compact graph: node IDs remapped to contiguous int32 indices and the adjacency
+    stored as CSR arrays, about 4 bytes per stored neighbour (plus 4 per weight) where a
+    networkx dict-of-dicts spends a few hundred bytes per edge.
+
+    node_ids[i] is the ID of node i. Row i of (indptr, indices) lists the neighbours of
+    node i in increasing index order (its successors when directed); an undirected edge
+    is stored in both rows, a self-loop once. weights maps an edge attribute name (e.g.
+    'contacts', 'Weight') to a float32 array aligned with indices.
+
+    Nodes are numbered in the order networkx would add them, so G.to_networkx() and
+    CSRGraph.from_networkx(G) keep the node order, and with it seeded results such as
+    the Louvain partition."""
+
+    def __init__(self, node_ids, indptr, indices, weights=None, directed=False):
+        self.node_ids = np.asarray(node_ids)
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights or {}
+        self.directed = directed
+        self._index = None
+
+    @classmethod
+    def from_edges(cls, sources, targets, weights=None, directed=False, node_ids=None):
+        """Builds the graph from parallel arrays of edge endpoint IDs and, optionally, a
+        {name: array} of edge weights. Repeated edges are merged and their weights
+        summed. node_ids fixes the node order (and may include isolated nodes); by
+        default nodes are numbered by first appearance, source before target."""
+        sources, targets = np.asarray(sources), np.asarray(targets)
+        if node_ids is None:
+            interleaved = np.empty(2 * len(sources), dtype=np.result_type(sources, targets))
+            interleaved[0::2], interleaved[1::2] = sources, targets
+            codes, node_ids = pd.factorize(interleaved)
+            source_codes, target_codes = codes[0::2], codes[1::2]
+        else:
+            index = pd.Index(node_ids)
+            source_codes, target_codes = index.get_indexer(sources), index.get_indexer(targets)
+            if (source_codes < 0).any() or (target_codes < 0).any():
+                raise ValueError("edge endpoints missing from node_ids")
+        return cls._from_codes(np.asarray(node_ids), source_codes, target_codes, weights, directed)
+
+    @classmethod
+    def _from_codes(cls, node_ids, sources, targets, weights, directed):
+        n = len(node_ids)
+        if n == 0:
+            return cls(node_ids, np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32),
+                       {name: np.zeros(0, dtype=np.float32) for name in weights or {}}, directed)
+        sources, targets = sources.astype(np.int64), targets.astype(np.int64)
+        weights = {name: np.asarray(values, dtype=np.float64) for name, values in (weights or {}).items()}
+        if not directed:
+            # store both directions, self-loops once
+            loop = sources == targets
+            sources, targets = (np.concatenate([sources, targets[~loop]]),
+                                np.concatenate([targets, sources[~loop]]))
+            weights = {name: np.concatenate([values, values[~loop]]) for name, values in weights.items()}
+        keys = sources * n + targets
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        starts = np.flatnonzero(first)
+        keys = keys[starts]
+        indptr = np.zeros(n + 1, dtype=index_dtype(len(keys)))
+        np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+        indices = (keys % n).astype(np.int32)
+        weights = {name: np.add.reduceat(values[order], starts).astype(np.float32) if len(starts)
+                   else np.zeros(0, dtype=np.float32) for name, values in weights.items()}
+        return cls(node_ids, indptr, indices, weights, directed)
+
+    @classmethod
+    def from_contacts(cls, contacts, directed=False):
+        """From aggregate_contacts output, keeping its 'contacts' and 'Weight' columns."""
+        weights = {column: contacts[column].to_numpy() for column in ("contacts", "Weight")
+                   if column in contacts.columns}
+        return cls.from_edges(contacts["Source"].to_numpy(), contacts["Target"].to_numpy(), weights, directed)
+
+    @classmethod
+    def from_networkx(cls, G, weights=None):
+        """From a networkx graph, keeping its node order. weights names the edge
+        attributes to keep (default: those of the first edge); edges without one count
+        as 1. Parallel edges of a MultiGraph are merged with their weights summed."""
+        nodes = list(G)
+        if weights is None:
+            weights = [name for name, value in next(iter(G.edges(data=True)), (None, None, {}))[2].items()
+                       if isinstance(value, (int, float, np.number))]
+        index = {node: i for i, node in enumerate(nodes)}
+        m = G.number_of_edges()
+        sources = np.fromiter((index[u] for u, v in G.edges()), dtype=np.int64, count=m)
+        targets = np.fromiter((index[v] for u, v in G.edges()), dtype=np.int64, count=m)
+        values = {name: np.fromiter((data.get(name, 1) for u, v, data in G.edges(data=True)), dtype=np.float64,
+                                    count=m) for name in weights}
+        node_ids = np.empty(len(nodes), dtype=object)
+        node_ids[:] = nodes
+        if nodes and all(isinstance(node, (int, np.integer)) for node in nodes):
+            node_ids = node_ids.astype(np.int64)
+        return cls._from_codes(node_ids, sources, targets, values, G.is_directed())
+
+    def to_networkx(self):
+        """nx.Graph / nx.DiGraph with the same nodes, in the same order, and the weights
+        as edge attributes."""
+        import networkx as nx
+        G = nx.DiGraph() if self.directed else nx.Graph()
+        G.add_nodes_from(self.node_ids.tolist())
+        sources, targets = self.edge_arrays()
+        once = self._once()
+        names = list(self.weights)
+        columns = [self.weights[name][once].tolist() for name in names]
+        ids = self.node_ids
+        attributes = (dict(zip(names, values)) for values in zip(*columns)) if names else repeat({})
+        G.add_edges_from(zip(ids[sources].tolist(), ids[targets].tolist(), attributes))
+        return G
+
+    def to_undirected(self):
+        """The undirected graph with an edge wherever either direction has one; weights
+        of reciprocal pairs are summed."""
+        if not self.directed:
+            return self
+        rows = np.repeat(np.arange(len(self.node_ids), dtype=np.int64), np.diff(self.indptr))
+        return CSRGraph._from_codes(self.node_ids, rows, self.indices, self.weights, directed=False)
+
+    def to_scipy(self, weight=None, nodelist=None, dtype=np.float64):
+        """The adjacency as a scipy CSR array (rows are edge sources), sharing the index
+        arrays. Entries are the named weight, or 1 when weight is None or not stored.
+        nodelist reorders rows and columns, like nx.to_scipy_sparse_array."""
+        if weight in self.weights:
+            data = self.weights[weight].astype(dtype)
+        else:
+            data = np.ones(len(self.indices), dtype=dtype)
+        n = len(self.node_ids)
+        A = sp.csr_array((data, self.indices, self.indptr), shape=(n, n))
+        if nodelist is not None and not np.array_equal(np.asarray(nodelist, dtype=self.node_ids.dtype), self.node_ids):
+            positions = self.index_of(nodelist)
+            if (positions < 0).any():
+                raise ValueError("nodelist contains nodes that are not in the graph")
+            A = A[positions][:, positions]
+        return A
+
+    def edge_arrays(self):
+        """(sources, targets) index arrays with every edge once (i <= j when undirected)."""
+        rows = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.indptr))
+        once = self._once(rows)
+        return rows[once], self.indices[once]
+
+    def edge_weights(self, name):
+        """The named weight aligned with edge_arrays(), 1 for every edge when not stored."""
+        if name not in self.weights:
+            return np.ones(self.number_of_edges())
+        return self.weights[name][self._once()].astype(np.float64)
+
+    def _once(self, rows=None):
+        if self.directed:
+            return slice(None)
+        if rows is None:
+            rows = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.indptr))
+        return rows <= self.indices
+
+    def content_hash(self):
+        """Hash of the nodes, edges and weights, read block by block so memory-mapped
+        arrays are not loaded at once."""
+        digest = hashlib.sha1(str(self.directed).encode())
+        for array in [np.asarray(self.node_ids, dtype=str) if self.node_ids.dtype == object else self.node_ids,
+                      self.indptr, self.indices] + [self.weights[name] for name in sorted(self.weights)]:
+            for start in range(0, len(array), 1 << 22):
+                digest.update(np.ascontiguousarray(array[start:start + (1 << 22)]).tobytes())
+        return digest.hexdigest()
+
+    def index_of(self, ids):
+        """Indices of the given node IDs, -1 for unknown ones."""
+        if self._index is None:
+            self._index = pd.Index(self.node_ids)
+        return self._index.get_indexer(np.asarray(ids, dtype=self.node_ids.dtype))
+
+    def neighbors(self, node):
+        i = self.index_of([node])[0]
+        if i < 0:
+            raise KeyError(node)
+        return self.node_ids[self.indices[self.indptr[i]:self.indptr[i + 1]]].tolist()
+
+    def degree(self, weight=None):
+        """Degree array aligned with node_ids, counted like G.degree(weight=weight): a
+        self-loop counts twice, a directed node's in- and out-edges both count."""
+        rows = np.repeat(np.arange(len(self.node_ids)), np.diff(self.indptr))
+        data = self.weights[weight].astype(np.float64) if weight in self.weights else None
+        n = len(self.node_ids)
+        degree = np.bincount(rows, weights=data, minlength=n)
+        if self.directed:
+            degree += np.bincount(self.indices, weights=data, minlength=n)
+        else:
+            loop = rows == self.indices
+            degree += np.bincount(rows[loop], weights=None if data is None else data[loop], minlength=n)
+        return degree if data is not None else degree.astype(np.int64)
+
+    def size(self, weight=None):
+        """Number of edges, or their total weight (G.size(weight=weight))."""
+        if weight not in self.weights:
+            return self.number_of_edges()
+        return float(self.weights[weight][self._once()].sum(dtype=np.float64))
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        if self.directed:
+            return len(self.indices)
+        return int(np.count_nonzero(self._once()))
+
+    def is_directed(self):
+        return self.directed
+
+    def nodes(self):
+        return self.node_ids.tolist()
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __iter__(self):
+        return iter(self.node_ids.tolist())
+
+    def __contains__(self, node):
+        try:
+            return self.index_of([node])[0] >= 0
+        except (TypeError, ValueError):
+            return False
+
+    @property
+    def nbytes(self):
+        return (self.node_ids.nbytes + self.indptr.nbytes + self.indices.nbytes
+                + sum(values.nbytes for values in self.weights.values()))
@@ -0,0 +1,119 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from tracing import tracer
+
+# Student IDs and contact weights fit comfortably in 32 bits
+EDGE_DTYPES = {"Source": np.int32, "Target": np.int32, "Weight": np.int32}
+NODE_DTYPES = {"ID": np.int32, "Class": "category", "Gender": "category"}
+ID_COLUMNS = ("Source", "Target", "ID")
+
+
+def _parser_engine():
+    """pyarrow parses CSV with multiple threads; fall back to the C parser without it."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "c"
+    return "pyarrow"
+
+
+def _read_typed_csv(filepath, dtypes):
+    header = pd.read_csv(filepath, nrows=0, encoding="utf-8-sig").columns
+    dtype = {column: dtypes[column] for column in header if column in dtypes}
+    # integer columns are parsed as int64 (the C parser wraps int32 overflow silently)
+    # and narrowed to int32 afterwards when the values fit
+    integer = [column for column, kind in dtype.items() if kind is np.int32]
+    try:
+        df = pd.read_csv(filepath, dtype={**dtype, **dict.fromkeys(integer, np.int64)}, engine=_parser_engine(),
+                         encoding="utf-8-sig")
+    except (ValueError, OverflowError):
+        # e.g. fractional weights: only the integer columns are inferred
+        df = pd.read_csv(filepath, dtype={column: kind for column, kind in dtype.items() if column not in integer},
+                         engine=_parser_engine(), encoding="utf-8-sig")
+        for column in integer:
+            df[column] = pd.to_numeric(df[column])
+    # node IDs share one dtype, so Source and Target stay comparable
+    _narrow(df, [column for column in integer if column in ID_COLUMNS])
+    _narrow(df, [column for column in integer if column not in ID_COLUMNS])
+    return df
+
+
+def _narrow(df, columns):
+    """Casts the columns to int32 when all their values are integers that fit, to int64
+    beyond; a column with fractional values (e.g. weights) is left as it is."""
+    integral = []
+    for column in columns:
+        values = df[column]
+        if values.dtype.kind == 'f' and not values.isna().any() and (values == values.round()).all():
+            df[column] = values = values.astype(np.int64)
+        if values.dtype.kind in 'iu':
+            integral.append(column)
+    bounds = np.iinfo(np.int32)
+    fits = all(len(df) == 0 or (df[column].min() >= bounds.min and df[column].max() <= bounds.max)
+               for column in integral)
+    for column in integral:
+        df[column] = df[column].astype(np.int32 if fits else np.int64)
+
+
+def file_stamp(filepath):
+    stat = os.stat(filepath)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def sidecar_path(filepath):
+    return filepath + ".npy"
+
+
+def _load_sidecar(filepath):
+    sidecar = sidecar_path(filepath)
+    try:
+        with open(sidecar + ".json") as f:
+            meta = json.load(f)
+        if meta["stamp"] != file_stamp(filepath):
+            return None  # the CSV changed since the sidecar was written
+        records = np.load(sidecar, mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    return pd.DataFrame({column: records[column] for column in meta["columns"]})
+
+
+def _write_sidecar(filepath, df):
+    if not all(np.issubdtype(dtype, np.number) for dtype in df.dtypes):
+        return
+    sidecar = sidecar_path(filepath)
+    records = np.empty(len(df), dtype=[(column, df[column].dtype) for column in df.columns])
+    for column in df.columns:
+        records[column] = df[column].to_numpy()
+    try:
+        np.save(sidecar, records)
+        with open(sidecar + ".json", "w") as f:
+            json.dump({"stamp": file_stamp(filepath), "columns": list(df.columns)}, f)
+    except OSError:
+        pass  # read-only data directory, the sidecar is only an optimisation
+
+
+def read_edge_csv(filepath, use_cache=True):
+    """Loads an edge CSV with Source/Target/Weight parsed as fixed-width integers.
+
+    The first load writes a binary sidecar next to the CSV (<file>.npy plus a small
+    .json stamp with the CSV size and mtime); later loads memory-map the sidecar
+    instead of re-parsing, as long as the CSV is unchanged."""
+    if use_cache:
+        with tracer.stage("read edge sidecar"):
+            df = _load_sidecar(filepath)
+        if df is not None:
+            return df
+    with tracer.stage("parse edge CSV"):
+        df = _read_typed_csv(filepath, EDGE_DTYPES)
+    if use_cache:
+        _write_sidecar(filepath, df)
+    return df
+
+
+def read_node_csv(filepath):
+    """Loads the node metadata CSV with integer IDs and categorical Class/Gender."""
+    return _read_typed_csv(filepath, NODE_DTYPES)
@@ -0,0 +1,253 @@
+"""Out-of-core edge ingestion: builds a memory-mapped CSRGraph from an edge CSV that
+does not fit in memory.
+
+The CSV is read in chunks. Each chunk's (Source, Target) pairs are mapped to node
+indices, keyed as source << 32 | target and aggregated. The aggregates are buffered
+and spilled to disk as sorted runs once the buffer is full. The runs are then merged
+block by block (several passes when there are many), which gives the CSR adjacency in
+order: it is written straight to disk and memory-mapped. The memory budget sizes the
+chunks, the run buffer and the merge blocks. The node ID table stays in memory, as
+there are far fewer nodes than contact rows.
+
+    graph = ingest_edges("contacts.csv", "contacts.csr", memory_mb=256)
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from csr_graph import CSRGraph, index_dtype
+from edge_io import file_stamp
+from tracing import tracer
+
+DEFAULT_MEMORY_MB = 512
+MAX_FAN_IN = 64  # runs merged in one pass
+# rough bytes held per CSV row while a chunk is parsed, mapped and aggregated
+ROW_BYTES = 200
+META_FILE = "meta.json"
+
+
+class _NodeIndex:
+    """Node ID -> index table grown chunk by chunk, in order of first appearance."""
+
+    def __init__(self):
+        self.ids = pd.Index(np.zeros(0, dtype=np.int64))
+
+    def codes(self, values):
+        codes = self.ids.get_indexer(values)
+        new = codes < 0
+        if new.any():
+            self.ids = self.ids.append(pd.Index(pd.unique(values[new])))
+            codes[new] = self.ids.get_indexer(values[new])
+        return codes
+
+
+def _record_dtype(weighted):
+    fields = [('key', np.int64), ('contacts', np.int64)]
+    if weighted:
+        fields.append(('Weight', np.float64))
+    return np.dtype(fields)
+
+
+def _reduce(records):
+    """Sorts records by key and sums the duplicates."""
+    records = records[np.argsort(records['key'], kind='stable')]
+    first = np.ones(len(records), dtype=bool)
+    first[1:] = records['key'][1:] != records['key'][:-1]
+    starts = np.flatnonzero(first)
+    reduced = np.empty(len(starts), dtype=records.dtype)
+    reduced['key'] = records['key'][starts]
+    for name in records.dtype.names[1:]:
+        reduced[name] = np.add.reduceat(records[name], starts) if len(starts) else 0
+    return reduced
+
+
+def _chunk_records(chunk, nodes, directed, dtype):
+    """Aggregated records of one chunk of CSV rows; undirected rows count for both
+    directions (a self-loop once), like aggregate_contacts with symmetrize."""
+    sources = chunk["Source"].to_numpy(dtype=np.int64)
+    targets = chunk["Target"].to_numpy(dtype=np.int64)
+    interleaved = np.empty(2 * len(sources), dtype=np.int64)
+    interleaved[0::2], interleaved[1::2] = sources, targets
+    codes = nodes.codes(interleaved)
+    sources, targets = codes[0::2], codes[1::2]
+    weights = chunk["Weight"].to_numpy(dtype=np.float64) if 'Weight' in dtype.names else None
+    if not directed:
+        mirror = sources != targets
+        sources, targets = np.concatenate([sources, targets[mirror]]), np.concatenate([targets, sources[mirror]])
+        if weights is not None:
+            weights = np.concatenate([weights, weights[mirror]])
+    records = np.empty(len(sources), dtype=dtype)
+    records['key'] = (sources << 32) | targets
+    records['contacts'] = 1
+    if weights is not None:
+        records['Weight'] = weights
+    return _reduce(records)
+
+
+def _merge(paths, dtype, block, emit):
+    """k-way merge of sorted runs, block by block: everything up to the smallest last
+    key of the current blocks is complete, so it is reduced and emitted in key order.
+    Blocks are read with np.fromfile rather than memory-mapped, so the runs do not
+    stay resident."""
+    lengths = [os.path.getsize(path) // dtype.itemsize for path in paths]
+    positions = [0] * len(paths)
+    while True:
+        active = [i for i in range(len(paths)) if positions[i] < lengths[i]]
+        if not active:
+            break
+        blocks = {i: np.fromfile(paths[i], dtype=dtype, count=min(block, lengths[i] - positions[i]),
+                                 offset=positions[i] * dtype.itemsize) for i in active}
+        bound = min(blocks[i]['key'][-1] for i in active)
+        parts = []
+        for i in active:
+            take = np.searchsorted(blocks[i]['key'], bound, side='right')
+            parts.append(blocks[i][:take])
+            positions[i] += take
+        del blocks
+        emit(_reduce(np.concatenate(parts)))
+
+
+def _plan(memory_mb, itemsize):
+    budget = memory_mb * 2 ** 20
+    chunk_rows = max(budget // 4 // ROW_BYTES, 1000)
+    # a spill concatenates, sorts and reduces the buffer: about three copies of it
+    buffer_records = max(budget // 4 // (3 * itemsize), 1000)
+    # merge blocks of all runs of a pass (and their reduced copies) share half the budget
+    merge_records = max(budget // 2 // (3 * itemsize), 1000 * MAX_FAN_IN)
+    return chunk_rows, buffer_records, merge_records
+
+
+def _read_chunks(filepath, chunk_rows):
+    """(weighted, iterator of DataFrame chunks) of the edge columns of the CSV."""
+    header = pd.read_csv(filepath, nrows=0, encoding="utf-8-sig").columns
+    dtypes = {"Source": np.int64, "Target": np.int64, "Weight": np.float64}
+    dtype = {column: dtypes[column] for column in header if column in dtypes}
+    chunks = pd.read_csv(filepath, usecols=list(dtype), dtype=dtype, chunksize=chunk_rows, encoding="utf-8-sig")
+    return 'Weight' in dtype, chunks
+
+
+def ingest_edges(filepath, out_dir, directed=False, memory_mb=DEFAULT_MEMORY_MB, progress=None):
+    """Aggregates the edge CSV at filepath into a CSR graph stored in out_dir and
+    returns it memory-mapped (see open_csr). Node IDs must be integers.
+
+    The result has the same edges and 'contacts'/'Weight' as
+    CSRGraph.from_contacts(aggregate_contacts(edge_df)); nodes are numbered by first
+    appearance in the file. out_dir is reused as long as the CSV is unchanged and
+    directed matches. progress(rows) is called after every chunk."""
+    try:
+        meta = _read_meta(out_dir)
+        if meta['stamp'] == file_stamp(filepath) and meta['directed'] == directed:
+            return open_csr(out_dir)
+    except (OSError, ValueError, KeyError):
+        pass
+    os.makedirs(out_dir, exist_ok=True)
+    if os.path.exists(os.path.join(out_dir, META_FILE)):
+        os.remove(os.path.join(out_dir, META_FILE))  # the files are about to be overwritten
+    run_dir = os.path.join(out_dir, "runs")
+    os.makedirs(run_dir, exist_ok=True)
+    chunk_rows, buffer_records, merge_records = _plan(memory_mb, _record_dtype(True).itemsize)
+    weighted, chunks = _read_chunks(filepath, chunk_rows)
+    dtype = _record_dtype(weighted)
+    nodes = _NodeIndex()
+    runs = []
+
+    def spill(buffer):
+        path = os.path.join(run_dir, f"run{len(runs)}.bin")
+        _reduce(np.concatenate(buffer)).tofile(path)
+        runs.append(path)
+
+    try:
+        buffer, buffered, rows = [], 0, 0
+        with tracer.stage("stream edge chunks"):
+            for chunk in chunks:
+                records = _chunk_records(chunk, nodes, directed, dtype)
+                buffer.append(records)
+                buffered += len(records)
+                rows += len(chunk)
+                if buffered >= buffer_records:
+                    spill(buffer)
+                    buffer, buffered = [], 0
+                if progress is not None:
+                    progress(rows)
+            if buffer or not runs:
+                spill(buffer or [np.zeros(0, dtype=dtype)])
+        n = len(nodes.ids)
+        if n >= 2 ** 31:
+            raise ValueError("more than 2^31 nodes do not fit int32 indices")
+        with tracer.stage("merge sorted runs"):
+            # merge MAX_FAN_IN runs at a time into longer ones until one pass is left
+            while len(runs) > MAX_FAN_IN:
+                merged = []
+                for first in range(0, len(runs), MAX_FAN_IN):
+                    group = runs[first:first + MAX_FAN_IN]
+                    path = os.path.join(run_dir, f"merged{len(merged)}-{len(runs)}.bin")
+                    with open(path, "wb") as f:
+                        _merge(group, dtype, merge_records // len(group), lambda records: records.tofile(f))
+                    for old in group:
+                        os.remove(old)
+                    merged.append(path)
+                runs = merged
+            meta = _write_csr(out_dir, runs, dtype, merge_records, nodes.ids.to_numpy(), directed)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    meta.update(stamp=file_stamp(filepath), source=os.path.abspath(filepath), rows=rows)
+    # written last: a directory without it is an interrupted ingestion
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+    return open_csr(out_dir)
+
+
+def _write_csr(out_dir, runs, dtype, merge_records, node_ids, directed):
+    """Merges the final runs straight into the CSR files: indices and weights are
+    appended as they come out of the merge, the row counts give indptr at the end.
+    Returns the metadata."""
+    n = len(node_ids)
+    names = list(dtype.names[1:])
+    counts = np.zeros(n, dtype=np.int64)
+    files = {'indices': open(os.path.join(out_dir, "indices.bin"), "wb")}
+    for name in names:
+        files[name] = open(os.path.join(out_dir, f"{name}.bin"), "wb")
+    nnz = 0
+
+    def emit(records):
+        nonlocal nnz
+        keys = records['key']
+        counts[:] += np.bincount(keys >> 32, minlength=n)
+        files['indices'].write((keys & 0xFFFFFFFF).astype(np.int32).tobytes())
+        for name in names:
+            files[name].write(records[name].astype(np.float32).tobytes())
+        nnz += len(records)
+
+    try:
+        _merge(runs, dtype, merge_records // max(len(runs), 1), emit)
+    finally:
+        for f in files.values():
+            f.close()
+    indptr = np.zeros(n + 1, dtype=index_dtype(nnz))
+    np.cumsum(counts, out=indptr[1:])
+    np.save(os.path.join(out_dir, "indptr.npy"), indptr)
+    np.save(os.path.join(out_dir, "node_ids.npy"), node_ids)
+    return {'nodes': n, 'nnz': nnz, 'directed': directed, 'weights': names}
+
+
+def _read_meta(directory):
+    with open(os.path.join(directory, META_FILE)) as f:
+        return json.load(f)
+
+
+def open_csr(directory):
+    """The CSRGraph written by ingest_edges, with its arrays memory-mapped."""
+    meta = _read_meta(directory)
+
+    def load(name, dtype):
+        if meta['nnz'] == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype, mode='r', shape=(meta['nnz'],))
+
+    weights = {name: load(name, np.float32) for name in meta['weights']}
+    return CSRGraph(np.load(os.path.join(directory, "node_ids.npy")),
+                    np.load(os.path.join(directory, "indptr.npy"), mmap_mode='r'),
+                    load("indices", np.int32), weights, meta['directed'])
@@ -0,0 +1,282 @@
+import hashlib
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from centrality import forget_sweep
+from csr_graph import CSRGraph
+from tracing import tracer
+
+
+def hash_edges(edge_df):
+    """Returns a content hash of the edge data, independent of where it was loaded from."""
+    return _edge_digest(edge_df).hexdigest()
+
+
+def _edge_digest(edge_df):
+    # sha1 over per-row hashes: rows appended later can be fed to the same digest
+    digest = hashlib.sha1()
+    digest.update(",".join(map(str, edge_df.columns)).encode())
+    _update_digest(digest, edge_df)
+    return digest
+
+
+def _update_digest(digest, edge_df):
+    digest.update(pd.util.hash_pandas_object(edge_df, index=False).values.tobytes())
+
+
+def aggregate_contacts(edge_df, symmetrize=True):
+    """Collapses repeated contact rows into one row per (Source, Target) pair.
+
+    The result has a 'contacts' column with the number of rows of each pair and,
+    when the edge file has a Weight column, the summed 'Weight'. With symmetrize,
+    (a, b) and (b, a) count as the same pair."""
+    codes, node_ids = pd.factorize(np.concatenate([edge_df["Source"].to_numpy(), edge_df["Target"].to_numpy()]))
+    n = max(len(node_ids), 1)
+    sources, targets = codes[:len(edge_df)].astype(np.int64), codes[len(edge_df):].astype(np.int64)
+    if symmetrize:
+        sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+    pair_keys, inverse, counts = np.unique(sources * n + targets, return_inverse=True, return_counts=True)
+    contacts = pd.DataFrame({"Source": node_ids[pair_keys // n], "Target": node_ids[pair_keys % n], "contacts": counts})
+    if "Weight" in edge_df.columns:
+        weight_sums = np.bincount(inverse, weights=edge_df["Weight"].to_numpy(), minlength=len(pair_keys))
+        if np.issubdtype(edge_df["Weight"].dtype, np.integer):
+            weight_sums = weight_sums.astype(np.int64)
+        contacts["Weight"] = weight_sums
+    return contacts
+
+
+def contact_graph(contacts, directed=False):
+    """Builds a weighted simple graph from aggregate_contacts output.
+
+    The per-pair attributes are stored as 'contacts' and 'Weight' rather than
+    'weight', so networkx algorithms keep their unweighted defaults."""
+    edge_attr = [column for column in ("contacts", "Weight") if column in contacts.columns]
+    return nx.from_pandas_edgelist(contacts, source="Source", target="Target", edge_attr=edge_attr,
+                                   create_using=nx.DiGraph() if directed else nx.Graph())
+
+
+def _add_contacts(G, u, v, row, has_weight):
+    """Adds the contacts (and Weight) of an aggregated row to edge (u, v) of G, creating
+    the edge when needed. Returns True for a new edge."""
+    if G.has_edge(u, v):
+        data = G[u][v]
+        data['contacts'] += row.contacts
+        if has_weight:
+            data['Weight'] += row.Weight
+        return False
+    attributes = {'contacts': row.contacts}
+    if has_weight:
+        attributes['Weight'] = row.Weight
+    G.add_edge(u, v, **attributes)
+    return True
+
+
+def undirected_contacts(G):
+    """G.to_undirected() with the 'contacts'/'Weight' of reciprocal pairs summed, where
+    networkx keeps the attributes of only one of the two directions."""
+    U = G.to_undirected()
+    for u, v, data in U.edges(data=True):
+        if u != v and G.has_edge(u, v) and G.has_edge(v, u):
+            for name in ("contacts", "Weight"):
+                if name in data:
+                    data[name] = G[u][v][name] + G[v][u][name]
+    return U
+
+
+class GraphStore:
+    """Builds the analysis graph once per loaded edge file and hands the cached
+    copy to every handler, instead of calling nx.from_pandas_edgelist per click.
+
+    Repeated contacts are aggregated first, so the graph has one edge per pair
+    carrying its 'contacts' count (and summed 'Weight').
+
+    structure_version changes whenever the set of nodes or pairs may have changed and
+    weights_version whenever contact counts or weights may have changed, so results
+    that only depend on the unweighted structure survive batches of repeat contacts."""
+
+    def __init__(self):
+        self._edge_df = None
+        self._batches = []  # appended since edge_df was last concatenated
+        self.graph_type = None
+        self.version = 0  # bumped on every invalidation so dependent caches can tell
+        self.structure_version = 0
+        self.weights_version = 0
+        self._graph = None
+        self._undirected = None
+        self._csr = None
+        self._contacts = None
+        self._degree_centrality = None
+        self._digest = None
+
+    @property
+    def edge_df(self):
+        """The loaded edge rows followed by every appended batch. The batches are only
+        concatenated when the whole table is needed (e.g. to rebuild the graph)."""
+        if self._batches:
+            self._edge_df = pd.concat([self._edge_df, *self._batches], ignore_index=True)
+            self._batches = []
+        return self._edge_df
+
+    @property
+    def columns(self):
+        """Columns of the edge data; appended batches are conformed to them."""
+        return None if self._edge_df is None else self._edge_df.columns
+
+    def load_edges(self, edge_df):
+        """Replaces the edge data and drops every graph built from the old one."""
+        self._edge_df = edge_df
+        self._batches = []
+        self._digest = None
+        self.invalidate()
+
+    def set_graph_type(self, graph_type):
+        """Called when the Direct/Undirect combobox changes."""
+        if graph_type != self.graph_type:
+            self.graph_type = graph_type
+            self.invalidate()
+
+    def invalidate(self):
+        self._graph = None
+        self._undirected = None
+        self._csr = None
+        self._contacts = None
+        self._degree_centrality = None
+        self.version += 1
+        self.structure_version += 1
+        self.weights_version += 1
+
+    def append_edges(self, batch_df):
+        """Merges a batch of new contact rows into the loaded data.
+
+        The cached graphs are updated in place in O(batch): repeated pairs get their
+        'contacts'/'Weight' increased, new pairs and nodes are added, and the rows are
+        queued for edge_df rather than copied into it. A batch without a Weight column
+        counts Weight 1 per contact when the loaded data has one. The content hash
+        is extended with the batch rows, so it equals the hash of loading all the rows
+        at once. Returns (new_pairs, new_nodes), or (None, None) when no graph had been
+        built yet; when both are 0 the unweighted structure, and every result computed
+        from it, is still valid."""
+        if self._edge_df is None:
+            self.load_edges(batch_df)
+            return None, None
+        batch_df = self._conform(batch_df)
+        if self._digest is not None:
+            if (batch_df.dtypes == self._edge_df.dtypes).all():
+                _update_digest(self._digest, batch_df)
+            else:
+                self._digest = None  # the concatenation upcasts, rehash it on next use
+        self._batches.append(batch_df)
+        self._contacts = None
+        self._csr = None  # rebuilt from the merged contacts on next use
+        self.weights_version += 1
+        if self._graph is None:
+            self.structure_version += 1
+            return None, None
+
+        G = self._graph
+        # the undirected view of a directed graph sums both directions of a pair
+        undirected = self._undirected if self._undirected is not G else None
+        n_before = G.number_of_nodes()
+        new_pairs = 0
+        touched = set()
+        batch = aggregate_contacts(batch_df, symmetrize=not self.is_directed())
+        has_weight = "Weight" in batch.columns
+        for row in batch.itertuples(index=False):
+            u, v = row.Source, row.Target
+            if undirected is not None:
+                _add_contacts(undirected, u, v, row, has_weight)
+            if _add_contacts(G, u, v, row, has_weight):
+                new_pairs += 1
+                touched.update((u, v))
+        new_nodes = G.number_of_nodes() - n_before
+
+        if new_pairs:
+            self.structure_version += 1
+            # shortest-path results were cached for the graph object that just changed
+            forget_sweep(G)
+            forget_sweep(self._undirected)
+            if new_nodes:
+                self._degree_centrality = None  # n changed, every value is rescaled
+            elif self._degree_centrality is not None:
+                scale = 1 / (G.number_of_nodes() - 1)
+                for node in touched:
+                    self._degree_centrality[node] = G.degree(node) * scale
+        return new_pairs, new_nodes
+
+    def degree_centrality(self, graph_type=None):
+        """nx.degree_centrality of the cached graph, kept up to date by append_edges."""
+        G = self.graph(graph_type)
+        if self._degree_centrality is None:
+            n = G.number_of_nodes()
+            scale = 1 / (n - 1) if n > 1 else 1
+            self._degree_centrality = {node: degree * scale for node, degree in G.degree()}
+        return self._degree_centrality
+
+    def content_hash(self):
+        """hash_edges of edge_df, computed once per edge file and extended by appends."""
+        if self._digest is None:
+            self._digest = _edge_digest(self.edge_df)
+        return self._digest.hexdigest()
+
+    def _conform(self, batch_df):
+        """The batch with the columns (and, where the values allow, dtypes) of the loaded
+        edge data."""
+        missing = [column for column in ("Source", "Target") if column not in batch_df.columns]
+        if missing:
+            raise ValueError(f"Appended edge file has no {', '.join(missing)} column")
+        if "Weight" in self._edge_df.columns and "Weight" not in batch_df.columns:
+            batch_df = batch_df.assign(Weight=1)
+        batch_df = batch_df[list(self._edge_df.columns)]
+        for column, dtype in self._edge_df.dtypes.items():
+            if batch_df[column].dtype != dtype:
+                cast = batch_df[column].astype(dtype)
+                if (cast == batch_df[column]).all():
+                    batch_df = batch_df.assign(**{column: cast})
+        return batch_df
+
+    def is_directed(self):
+        return self.graph_type == 'Direct Graph'
+
+    def graph(self, graph_type=None):
+        """Returns the cached graph for the selected type, building it on first use.
+        Callers must treat it as read only (use G.subgraph / G.copy to change it)."""
+        if graph_type is not None:
+            self.set_graph_type(graph_type)
+        if self._edge_df is None:
+            raise ValueError("Load an edge CSV file first")
+        if self._graph is None:
+            contacts = self.contacts()
+            with tracer.stage("build graph (from_pandas_edgelist)"):
+                self._graph = contact_graph(contacts, directed=self.is_directed())
+        return self._graph
+
+    def contacts(self):
+        """Returns the edge data aggregated to one row per pair (symmetrized when undirected)."""
+        if self._contacts is None:
+            with tracer.stage("aggregate contacts"):
+                self._contacts = aggregate_contacts(self.edge_df, symmetrize=not self.is_directed())
+        return self._contacts
+
+    def csr(self, graph_type=None):
+        """Returns the cached CSRGraph for the selected type, built from the aggregated
+        contacts without going through networkx. Same nodes, node order and edges as
+        graph(), at a fraction of the memory, for the analyses that work on arrays."""
+        if graph_type is not None:
+            self.set_graph_type(graph_type)
+        if self._edge_df is None:
+            raise ValueError("Load an edge CSV file first")
+        if self._csr is None:
+            contacts = self.contacts()
+            with tracer.stage("build CSR graph"):
+                self._csr = CSRGraph.from_contacts(contacts, directed=self.is_directed())
+        return self._csr
+
+    def undirected(self, graph_type=None):
+        """Returns the undirected view used by Louvain (G.to_undirected() once, not per click)."""
+        G = self.graph(graph_type)
+        if self._undirected is None:
+            with tracer.stage("to_undirected"):
+                self._undirected = undirected_contacts(G) if G.is_directed() else G
+        return self._undirected
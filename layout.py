@@ -0,0 +1,208 @@
+import weakref
+
+import numpy as np
+
+from tracing import tracer
+
+DEFAULT_SEED = 42  # fixed seed so the same graph is always drawn the same way
+EXACT_LIMIT = 1000  # above this many nodes the repulsion uses the grid approximation
+
+# positions per graph object, dropped when the graph is garbage collected
+_layout_cache = weakref.WeakKeyDictionary()
+
+
+def _edge_arrays(G, index):
+    edges = np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=np.int64)
+    return edges.reshape(-1, 2)
+
+
+def _repulsion(points, others, k2, weights=None, self_mask=None):
+    """Fruchterman-Reingold repulsion k^2 / d on every point from every one of others
+    (each counted weights times); self_mask marks the pairs of a point with itself."""
+    dx = points[:, 0, None] - others[None, :, 0]
+    dy = points[:, 1, None] - others[None, :, 1]
+    d2 = dx * dx + dy * dy
+    if self_mask is not None:
+        d2[self_mask] = np.inf
+    np.maximum(d2, 1e-9, out=d2)
+    scale = k2 / d2 if weights is None else (k2 * weights) / d2
+    return np.column_stack([(dx * scale).sum(axis=1), (dy * scale).sum(axis=1)])
+
+
+def _exact_repulsion(pos, k2, chunk=512):
+    n = len(pos)
+    force = np.empty_like(pos)
+    for start in range(0, n, chunk):
+        rows = np.arange(start, min(start + chunk, n))
+        force[rows] = _repulsion(pos[rows], pos, k2, self_mask=rows[:, None] == np.arange(n)[None, :])
+    return force
+
+
+def _grid_repulsion(pos, k2, per_cell=32, chunk=4096):
+    """Barnes-Hut on a grid pyramid: nodes are binned into a 2^L x 2^L grid and every
+    coarser level merges 2x2 cells, keeping their total mass and centroid. Repulsion
+    from the 3x3 neighbourhood of a node's cell is exact. The rest of the plane is
+    covered, level by level, by the cells that are not neighbours of the node's
+    cell at that level but whose parents neighbour its parent (at most 27 a level),
+    each acting as one point of its mass at its centroid. About 9 * per_cell + 27 * L
+    terms per node, so O(n log n) instead of O(n^2)."""
+    n = len(pos)
+    levels = max(0, int(np.ceil(np.log2(max(np.sqrt(n / per_cell), 1)))))
+    side = 2 ** levels
+    low = pos.min(axis=0)
+    span = np.maximum(pos.max(axis=0) - low, 1e-9)
+    cell_xy = np.minimum(((pos - low) / span * side).astype(np.int64), side - 1)
+    cell = cell_xy[:, 0] * side + cell_xy[:, 1]
+    order = np.argsort(cell, kind='stable')
+    starts = np.searchsorted(cell[order], np.arange(side * side + 1))
+    occupied = np.flatnonzero(np.diff(starts))
+
+    # mass and centroid of every cell of every level, stored one level after the
+    # other, plus a massless entry at the end that pads the interaction lists
+    offsets = np.cumsum([0] + [4 ** level for level in range(levels + 1)])
+    mass = np.zeros(offsets[-1] + 1)
+    centroid = np.zeros((offsets[-1] + 1, 2))
+    for level in range(levels + 1):
+        shift = levels - level
+        flat = offsets[level] + (cell_xy[:, 0] >> shift) * 2 ** level + (cell_xy[:, 1] >> shift)
+        mass += np.bincount(flat, minlength=len(mass))
+        for axis in range(2):
+            centroid[:, axis] += np.bincount(flat, pos[:, axis], minlength=len(mass))
+    filled = mass > 0
+    centroid[filled] /= mass[filled, None]
+
+    # interaction lists of the occupied finest cells
+    fx, fy = divmod(occupied, side)
+    lists = []
+    for level in range(1, levels + 1):
+        shift, width = levels - level, 2 ** level
+        ax, ay = fx >> shift, fy >> shift
+        for ox in range(6):
+            x = (ax >> 1) * 2 - 2 + ox
+            for oy in range(6):
+                y = (ay >> 1) * 2 - 2 + oy
+                valid = ((x >= 0) & (x < width) & (y >= 0) & (y < width)
+                         & ((np.abs(x - ax) > 1) | (np.abs(y - ay) > 1)))
+                lists.append(np.where(valid, offsets[level] + x * width + y, len(mass) - 1))
+    rank = np.zeros(side * side, dtype=np.int64)
+    rank[occupied] = np.arange(len(occupied))
+    far = np.column_stack(lists) if lists else np.zeros((len(occupied), 0), dtype=np.int64)
+    # drop the columns that are padding for every cell
+    far = far[:, (far != len(mass) - 1).any(axis=0)]
+
+    force = np.zeros_like(pos)
+    for c in occupied:
+        members = order[starts[c]:starts[c + 1]]
+        cx, cy = divmod(c, side)
+        x0, x1, y0, y1 = max(cx - 1, 0), min(cx + 2, side), max(cy - 1, 0), min(cy + 2, side)
+        near_nodes = np.concatenate([order[starts[x * side + y0]:starts[x * side + y1]] for x in range(x0, x1)])
+        force[members] = _repulsion(pos[members], pos[near_nodes], k2,
+                                    self_mask=members[:, None] == near_nodes[None, :])
+    if far.shape[1]:
+        for start in range(0, n, chunk):
+            rows = slice(start, min(start + chunk, n))
+            cells = far[rank[cell[rows]]]
+            dx = pos[rows, 0, None] - centroid[cells, 0]
+            dy = pos[rows, 1, None] - centroid[cells, 1]
+            scale = k2 * mass[cells] / np.maximum(dx * dx + dy * dy, 1e-9)
+            force[rows, 0] += (dx * scale).sum(axis=1)
+            force[rows, 1] += (dy * scale).sum(axis=1)
+    return force
+
+
+def force_layout(G, pos=None, iterations=50, seed=DEFAULT_SEED, progress=None):
+    """Vectorized Fruchterman-Reingold layout, a drop-in for nx.spring_layout(G).
+
+    pos warm-starts the run from known positions (in spring_layout's [-1, 1] box):
+    nodes without one start at the mean of their placed neighbours, and the initial
+    temperature is lowered so the known part of the picture stays where it was.
+    Repulsion is exact up to EXACT_LIMIT nodes and grid approximated above.
+    progress(fraction) is called once per iteration. Returns {node: array([x, y])}
+    rescaled to [-1, 1] like spring_layout."""
+    nodes = list(G)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: np.zeros(2)}
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = _edge_arrays(G, index)
+    rng = np.random.default_rng(seed)
+
+    xy = rng.random((n, 2))
+    known = np.zeros(n, dtype=bool)
+    if pos:
+        for node, p in pos.items():
+            i = index.get(node)
+            if i is not None:
+                xy[i] = (np.asarray(p) + 1) / 2  # back to the unit box the forces are tuned for
+                known[i] = True
+    warm = known.mean() > 0.5
+    if warm and not known.all():
+        _place_new_nodes(xy, known, edges, rng, 1 / np.sqrt(n))
+
+    k = 1 / np.sqrt(n)
+    k2 = k * k
+    span = xy.max(axis=0) - xy.min(axis=0)
+    # a warm start only needs to settle the new nodes, not to untangle the whole graph
+    temperature = max(span.max(), 1e-3) * (0.02 if warm else 0.1)
+    cooling = temperature / (iterations + 1)
+    repulsion = _exact_repulsion if n <= EXACT_LIMIT else _grid_repulsion
+    for iteration in range(iterations):
+        force = repulsion(xy, k2)
+        if len(edges):
+            # attraction d^2 / k along every edge, applied to both endpoints
+            delta = xy[edges[:, 0]] - xy[edges[:, 1]]
+            pull = delta * (np.sqrt(np.einsum('ij,ij->i', delta, delta)) / k)[:, None]
+            for axis in range(2):
+                force[:, axis] -= np.bincount(edges[:, 0], pull[:, axis], minlength=n)
+                force[:, axis] += np.bincount(edges[:, 1], pull[:, axis], minlength=n)
+        length = np.maximum(np.linalg.norm(force, axis=1), 0.01)
+        xy += force * (temperature / length)[:, None]
+        temperature -= cooling
+        if progress is not None:
+            progress((iteration + 1) / iterations)
+
+    xy -= xy.mean(axis=0)
+    scale = np.abs(xy).max()
+    if scale > 0:
+        xy /= scale
+    return dict(zip(nodes, xy))
+
+
+def _place_new_nodes(xy, known, edges, rng, jitter):
+    """Moves every unplaced node to the mean position of its placed neighbours."""
+    if len(edges):
+        both = np.concatenate([edges, edges[:, ::-1]])
+        both = both[known[both[:, 1]] & ~known[both[:, 0]]]
+        counts = np.bincount(both[:, 0], minlength=len(xy))
+        has = counts > 0
+        for axis in range(2):
+            sums = np.bincount(both[:, 0], xy[both[:, 1], axis], minlength=len(xy))
+            xy[has, axis] = sums[has] / counts[has]
+        new = ~known
+        xy[new] += rng.normal(scale=jitter, size=(new.sum(), 2))
+
+
+def graph_layout(G, seed=DEFAULT_SEED, progress=None):
+    """Cached layout of G, shared by every view of the same graph object.
+
+    The positions are reused as long as G has the same nodes and edges. When G was
+    grown in place (e.g. by GraphStore.append_edges) the new layout is warm-started
+    from the cached one, so the picture does not jump between clicks."""
+    stamp = (G.number_of_nodes(), G.number_of_edges())
+    cached = _layout_cache.get(G)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    previous = cached[1] if cached is not None else None
+    with tracer.stage("force_layout"):
+        pos = force_layout(G, pos=previous, iterations=15 if previous else 50, seed=seed, progress=progress)
+    _layout_cache[G] = (stamp, pos)
+    return pos
+
+
+def sub_layout(G, nodes, progress=None):
+    """Positions of a subset of G's nodes taken from the cached layout of the whole
+    graph, so filtered views line up with the full picture."""
+    pos = graph_layout(G, progress=progress)
+    return {node: pos[node] for node in nodes}
@@ -0,0 +1,162 @@
+import weakref
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from csr_graph import CSRGraph
+
+
+def _adjacency(G, nodes, weight):
+    if isinstance(G, CSRGraph):
+        return G.to_scipy(weight, nodes)
+    return nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, format='csr', dtype=np.float64)
+
+
+def _start_vector(nodes, previous):
+    """Initial iterate: the previous scores for nodes that already had one (warm start),
+    the mean of those for new nodes, or uniform when there is nothing to reuse."""
+    if not previous:
+        return np.full(len(nodes), 1.0 / max(len(nodes), 1))
+    fill = np.mean(list(previous.values()))
+    x = np.fromiter((previous.get(node, fill) for node in nodes), dtype=np.float64, count=len(nodes))
+    total = x.sum()
+    return x / total if total > 0 else np.full(len(nodes), 1.0 / len(nodes))
+
+
+def pagerank_csr(A, alpha=0.85, personalization=None, tol=1e-6, max_iter=100, x0=None):
+    """Power-iteration PageRank on a CSR adjacency matrix (rows are edge sources).
+
+    personalization is None (uniform), a vector of length n, or an n x B matrix with one
+    personalization vector per column, in which case all B rankings are iterated
+    together with sparse matrix-matrix products. Dangling nodes redistribute their
+    rank along the personalization vector and convergence uses the same L1
+    criterion as nx.pagerank. Returns (scores, iterations, converged)."""
+    n = A.shape[0]
+    out_weight = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inverse_out = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    transition_T = (sp.diags_array(inverse_out) @ A).T.tocsr()
+
+    if personalization is None:
+        P = np.full((n, 1), 1.0 / n)
+    else:
+        P = np.asarray(personalization, dtype=np.float64).reshape(n, -1)
+        P = P / P.sum(axis=0, keepdims=True)
+    if x0 is None:
+        X = np.full(P.shape, 1.0 / n)
+    else:
+        X = np.asarray(x0, dtype=np.float64).reshape(n, -1)
+        if X.shape[1] != P.shape[1]:
+            X = np.tile(X, (1, P.shape[1]))
+        X = X / X.sum(axis=0, keepdims=True)
+    single = personalization is None or np.ndim(personalization) == 1
+
+    for iteration in range(1, max_iter + 1):
+        X_last = X
+        X = alpha * (transition_T @ X_last + X_last[dangling].sum(axis=0) * P) + (1 - alpha) * P
+        if (np.abs(X - X_last).sum(axis=0) < n * tol).all():
+            return (X[:, 0] if single else X), iteration, True
+    return (X[:, 0] if single else X), max_iter, False
+
+
+def eigenvector_csr(A, tol=1e-6, max_iter=100, x0=None):
+    """Power iteration with (A^T + I), normalized to unit length, as nx.eigenvector_centrality.
+    Returns (scores, iterations, converged)."""
+    n = A.shape[0]
+    A_T = A.T.tocsr()
+    x = np.ones(n) if x0 is None else np.asarray(x0, dtype=np.float64)
+    x = x / x.sum()
+    for iteration in range(1, max_iter + 1):
+        x_last = x
+        x = x_last + A_T @ x_last
+        x = x / (np.linalg.norm(x) or 1)
+        if np.abs(x - x_last).sum() < n * tol:
+            return x, iteration, True
+    return x, max_iter, False
+
+
+class LinkAnalysis:
+    """Sparse linear-algebra backend for PageRank and eigenvector centrality.
+
+    Keeps the last converged scores of every measure per graph object, so the next run
+    on the same graph after it was changed in place (e.g. by GraphStore.append_edges)
+    starts from them instead of from a uniform vector. Another graph, e.g. a newly
+    loaded file or the other graph type, starts from scratch. last_run holds
+    (iterations, converged) of the most recent run per measure."""
+
+    def __init__(self, tol=1e-6, max_iter=100):
+        self.tol = tol
+        self.max_iter = max_iter
+        # graph -> {measure key: scores}, dropped when the graph is garbage collected
+        self.previous = weakref.WeakKeyDictionary()
+        self.last_run = {}
+
+    def pagerank(self, G, alpha=0.85, personalization=None, weight='weight', warm_start=True):
+        """Same result as nx.pagerank(G, alpha, personalization, weight=weight) within tol."""
+        nodes = list(G)
+        p = None
+        if personalization is not None:
+            p = np.fromiter((personalization.get(node, 0) for node in nodes), dtype=np.float64, count=len(nodes))
+        key = ('pagerank', alpha, weight, None if personalization is None else tuple(sorted(personalization.items())))
+        x0 = _start_vector(nodes, self._state(G).get(key) if warm_start else None)
+        x, iterations, converged = pagerank_csr(_adjacency(G, nodes, weight), alpha, p, self.tol, self.max_iter, x0)
+        if not converged:
+            raise nx.PowerIterationFailedConvergence(self.max_iter)
+        return self._remember(G, key, nodes, x, iterations, converged)
+
+    def eigenvector(self, G, weight=None, warm_start=True, strict=True):
+        """Same result as nx.eigenvector_centrality(G, weight=weight) within tol.
+        With strict=False the last iterate is returned when the iteration does not
+        converge (e.g. on an acyclic digraph), check last_run for the outcome."""
+        nodes = list(G)
+        key = ('eigenvector', weight)
+        previous = self._state(G).get(key) if warm_start else None
+        x0 = _start_vector(nodes, previous) if previous else None
+        x, iterations, converged = eigenvector_csr(_adjacency(G, nodes, weight), self.tol, self.max_iter, x0)
+        if strict and not converged:
+            raise nx.PowerIterationFailedConvergence(self.max_iter)
+        return self._remember(G, key, nodes, x, iterations, converged)
+
+    def personalized_pagerank(self, G, groups, alpha=0.85, weight='weight', warm_start=True):
+        """Personalized PageRank for every group at once.
+
+        groups maps a label (e.g. a Class from the node metadata) to its member nodes;
+        each column of the returned DataFrame is the ranking teleporting uniformly to
+        that group's members. Each column warm-starts from the last converged ranking
+        of its label on this graph."""
+        nodes = list(G)
+        index = {node: i for i, node in enumerate(nodes)}
+        labels = [label for label, members in groups.items() if any(node in index for node in members)]
+        P = np.zeros((len(nodes), len(labels)))
+        for j, label in enumerate(labels):
+            for node in groups[label]:
+                if node in index:
+                    P[index[node], j] = 1
+        key = ('personalized_pagerank', alpha, weight)
+        previous = self._state(G).get(key, {}) if warm_start else {}
+        X0 = None
+        if previous and labels:
+            X0 = np.column_stack([_start_vector(nodes, previous.get(label)) for label in labels])
+        X, iterations, converged = pagerank_csr(_adjacency(G, nodes, weight), alpha, P, self.tol, self.max_iter, X0)
+        self.last_run['personalized_pagerank'] = (iterations, converged)
+        if not converged:
+            raise nx.PowerIterationFailedConvergence(self.max_iter)
+        self._state(G)[key] = {**previous, **{label: dict(zip(nodes, X[:, j].tolist()))
+                                              for j, label in enumerate(labels)}}
+        return pd.DataFrame(X, index=pd.Index(nodes, name='Node ID'), columns=labels)
+
+    def _state(self, G):
+        return self.previous.setdefault(G, {})
+
+    def _remember(self, G, key, nodes, x, iterations, converged):
+        scores = dict(zip(nodes, x.tolist()))
+        if converged:
+            self._state(G)[key] = scores
+        else:
+            # the next run starts from scratch again, so the same graph always gives
+            # the same (non-converged) scores
+            self._state(G).pop(key, None)
+        self.last_run[key[0]] = (iterations, converged)
+        return scores
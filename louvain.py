@@ -0,0 +1,298 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import scipy.sparse as sp
+
+from community_metrics import to_csr
+
+MOVE_FRACTION = 0.5  # share of the nodes reconsidered in one synchronous sweep
+
+
+def adjacency(G, weight='weight', nodelist=None):
+    """Symmetric CSR adjacency used by the engine: directed graphs are symmetrized
+    (A + A^T) and self-loops are stored twice, so row sums equal G.degree(weight)."""
+    A, nodes = to_csr(G, weight=weight, nodelist=nodelist)
+    if G.is_directed():
+        A = A + A.T
+    else:
+        A = A + sp.diags_array(A.diagonal())
+    A = sp.csr_array(A)
+    A.sum_duplicates()
+    return A, nodes
+
+
+def _compact(labels):
+    """Renumbers labels to 0 .. k-1 in order of first appearance; returns (labels, k)."""
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(first))
+    return rank[inverse], len(first)
+
+
+def _quality(A, labels, degrees, two_m, resolution):
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    internal = A.data[labels[rows] == labels[A.indices]].sum()
+    totals = np.bincount(labels, weights=degrees)
+    return internal / two_m - resolution * np.sum((totals / two_m) ** 2)
+
+
+def _best_moves(A_off, labels, degrees, two_m, resolution, movers, allowed=None):
+    """Best community of every mover given the current labels (simultaneous update).
+
+    Returns (movers that should move, their new labels). allowed(rows, columns)
+    masks the candidate (mover, community) pairs, used by the refinement phase."""
+    n_communities = labels.max() + 1
+    P = sp.csr_array((np.ones(len(labels)), (np.arange(len(labels)), labels)),
+                     shape=(len(labels), n_communities))
+    K = sp.csr_array(A_off[movers] @ P)  # weight from each mover to each community
+    rows = np.repeat(np.arange(len(movers)), np.diff(K.indptr))
+    columns, weights = K.indices, K.data
+    totals = np.bincount(labels, weights=degrees, minlength=n_communities)
+    k = degrees[movers]
+    own = labels[movers]
+    is_own = columns == own[rows]
+    k_own = np.bincount(rows[is_own], weights=weights[is_own], minlength=len(movers))
+    stay = k_own - resolution * k * (totals[own] - k) / two_m
+    gain = weights - resolution * k[rows] * totals[columns] / two_m
+    gain[is_own] = -np.inf
+    if allowed is not None:
+        gain[~allowed(rows, columns)] = -np.inf
+    if not len(gain):
+        return movers[:0], own[:0]
+    # highest gain per row: sort by row, then by decreasing gain, and keep the first entry
+    order = np.lexsort((-gain, rows))
+    first = order[np.r_[0, np.flatnonzero(np.diff(rows[order])) + 1]]
+    move = gain[first] > stay[rows[first]] + 1e-12
+    return movers[rows[first][move]], columns[first][move]
+
+
+def _sweeps(A_off, labels, degrees, two_m, resolution, rng, tol, propose, max_sweeps=200):
+    """Applies the simultaneous moves proposed for a random share of the nodes, sweep
+    after sweep. Movers joining the same community together can overshoot, so a sweep
+    that lowers the quality is undone and retried with half as many movers.
+
+    propose(labels, movers) returns (nodes that move, their new labels). Without the
+    diagonal the quality is off by a constant, which is fine for comparing sweeps."""
+    labels = labels.copy()
+    quality = _quality(A_off, labels, degrees, two_m, resolution)
+    fraction = MOVE_FRACTION
+    idle = 0
+    for sweep in range(max_sweeps):
+        movers = np.flatnonzero(rng.random(len(labels)) < fraction)
+        moved, targets = propose(labels, movers)
+        trial = labels.copy()
+        trial[moved] = targets
+        new_quality = _quality(A_off, trial, degrees, two_m, resolution)
+        if new_quality < quality - 1e-12:
+            fraction /= 2
+            idle = idle + 1 if fraction * len(labels) < 1 else 0
+        else:
+            idle = idle + 1 if new_quality - quality < tol else 0
+            labels, quality = trial, new_quality
+            fraction = min(MOVE_FRACTION, fraction * 2)
+        if idle >= 3:
+            break
+    return labels
+
+
+def _move_nodes(A_off, labels, degrees, two_m, resolution, rng, tol):
+    """Louvain local moving phase (moving all nodes at once would make pairs of nodes
+    swap communities endlessly, hence the random share of movers)."""
+
+    def propose(labels, movers):
+        return _best_moves(A_off, labels, degrees, two_m, resolution, movers)
+
+    return _compact(_sweeps(A_off, labels, degrees, two_m, resolution, rng, tol, propose))[0]
+
+
+def _refine(A_off, labels, degrees, two_m, resolution, rng, tol):
+    """Leiden refinement: every community is split back into singletons that are then
+    merged greedily. A singleton may only join a sub-community of its own community
+    that it has an edge to and that does not move in the same sweep, so every
+    sub-community stays connected."""
+    n = len(labels)
+
+    def propose(sub, movers):
+        movers = movers[np.bincount(sub, minlength=n)[sub[movers]] == 1]
+        moving = np.zeros(n, dtype=bool)
+        moving[sub[movers]] = True
+        parent = np.zeros(n, dtype=np.int64)
+        parent[sub] = labels
+
+        def allowed(rows, columns):
+            return (parent[columns] == labels[movers][rows]) & ~moving[columns]
+
+        return _best_moves(A_off, sub, degrees, two_m, resolution, movers, allowed)
+
+    return _compact(_sweeps(A_off, np.arange(n), degrees, two_m, resolution, rng, tol, propose))[0]
+
+
+def louvain_csr(A, resolution=1.0, seed=None, refine=False, initial=None, tol=1e-7, max_levels=32):
+    """Louvain (refine=False) or Leiden-style (refine=True) community detection on the
+    symmetric CSR adjacency from adjacency(). initial optionally gives starting labels.
+
+    Each level runs vectorized local moving sweeps, optionally refines the communities
+    into connected sub-communities, and aggregates the graph with P^T A P. Returns a
+    label array aligned with the rows of A."""
+    rng = np.random.default_rng(seed)
+    two_m = A.sum()
+    n = A.shape[0]
+    if n == 0 or two_m == 0:
+        return np.arange(n)
+    membership = np.arange(n)  # original node -> node of the current level
+    labels = np.arange(n) if initial is None else _compact(np.asarray(initial))[0]
+    A_level = A
+    for level in range(max_levels):
+        degrees = np.asarray(A_level.sum(axis=1)).ravel()
+        A_off = A_level - sp.diags_array(A_level.diagonal())
+        A_off = sp.csr_array(A_off)
+        A_off.eliminate_zeros()
+        labels = _move_nodes(A_off, labels, degrees, two_m, resolution, rng, tol)
+        n_communities = labels.max() + 1
+        if n_communities == A_level.shape[0]:
+            break  # nothing merged, the partition is final
+        groups = _refine(A_off, labels, degrees, two_m, resolution, rng, tol) if refine else labels
+        n_groups = groups.max() + 1
+        if n_groups == A_level.shape[0]:
+            groups, n_groups = labels, n_communities  # refinement merged nothing
+        parent = np.zeros(n_groups, dtype=np.int64)
+        parent[groups] = labels
+        P = sp.csr_array((np.ones(len(groups)), (np.arange(len(groups)), groups)),
+                         shape=(len(groups), n_groups))
+        A_level = sp.csr_array(P.T @ A_level @ P)
+        membership = groups[membership]
+        labels = parent  # the next level starts from the communities found so far
+    return _compact(labels[membership])[0]
+
+
+def best_partition(graph, partition=None, weight='weight', resolution=1.0, random_state=None, refine=False):
+    """Drop-in for community.best_partition (python-louvain) on the CSR engine.
+    Returns {node: community}; refine=True adds the Leiden refinement step."""
+    if graph.number_of_nodes() == 0:
+        return {}
+    A, nodes = adjacency(graph, weight=weight)
+    initial = None
+    if partition is not None:
+        # nodes missing from partition start in a community of their own
+        ids = {}
+        initial = np.array([ids.setdefault(partition.get(node, ('new', node)), len(ids)) for node in nodes])
+    labels = louvain_csr(A, resolution, random_state, refine, initial)
+    return dict(zip(nodes, labels.tolist()))
+
+
+def resolution_sweep(graph, resolutions, weight='weight', random_state=None, refine=False):
+    """Partitions for many resolutions, sharing the adjacency matrix. Returns a list of
+    {'resolution', 'partition', 'modularity', 'communities'} dicts in the order of
+    resolutions. 'modularity' is the standard (resolution 1) modularity of the
+    partition, so the values can be compared across resolutions."""
+    if graph.number_of_nodes() == 0:
+        return [{'resolution': resolution, 'partition': {}, 'modularity': 0.0, 'communities': 0}
+                for resolution in resolutions]
+    A, nodes = adjacency(graph, weight=weight)
+    degrees = np.asarray(A.sum(axis=1)).ravel()
+    two_m = A.sum()
+    results = []
+    for resolution in resolutions:
+        labels = louvain_csr(A, resolution, random_state, refine)
+        results.append({
+            'resolution': resolution,
+            'partition': dict(zip(nodes, labels.tolist())),
+            'modularity': float(_quality(A, labels, degrees, two_m, 1.0)) if two_m else 0.0,
+            'communities': int(labels.max()) + 1 if len(labels) else 0,
+        })
+    return results
+
+
+def _pairwise(labels, score):
+    """Symmetric matrix of score between every pair of label rows (1 on the diagonal)."""
+    runs = len(labels)
+    matrix = np.ones((runs, runs))
+    for i in range(runs):
+        for j in range(i + 1, runs):
+            matrix[i, j] = matrix[j, i] = score(labels[i], labels[j])
+    return matrix
+
+
+def consensus_labels(A, labels, threshold=0.5, seed=None, refine=False):
+    """Consensus of several label rows: every edge of A is weighted by the share of runs
+    that put both ends in the same community, edges below threshold are dropped and
+    Louvain is run on the result. Co-assignment is only counted along edges, which keeps
+    it sparse; pairs that are never adjacent cannot pull a community together anyway."""
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    off_diagonal = rows != A.indices
+    rows, columns = rows[off_diagonal], A.indices[off_diagonal]
+    together = (labels[:, rows] == labels[:, columns]).mean(axis=0)
+    keep = together >= threshold
+    C = sp.csr_array((together[keep], (rows[keep], columns[keep])), shape=A.shape)
+    return louvain_csr(C, seed=seed, refine=refine)
+
+
+# adjacency and settings of an ensemble pool worker, set once per process by
+# _init_ensemble_worker so tasks only carry the seed
+_worker_state = None
+
+
+def _init_ensemble_worker(A, resolution, refine):
+    global _worker_state
+    _worker_state = (A, resolution, refine)
+
+
+def _ensemble_worker_run(seed):
+    A, resolution, refine = _worker_state
+    return louvain_csr(A, resolution, seed, refine)
+
+
+def louvain_ensemble(graph, runs=10, seed=0, resolution=1.0, refine=False, weight='weight', processes=1,
+                     ground_truth=None, threshold=0.5, progress=None):
+    """Runs Louvain with seeds seed .. seed + runs - 1, in a process pool when
+    processes > 1 (None uses every core), and measures how much the runs agree.
+
+    Returns a dict with the seeds, the partition, community count and (standard)
+    modularity of each run, the consensus partition, the pairwise 'nmi' and 'ari' matrices between runs and,
+    when ground_truth ({node: class}) is given, the NMI of every run ('class_nmi') and of
+    the consensus ('consensus_nmi') to it on the nodes it covers.
+    progress(fraction) is called as runs complete and may raise to abort."""
+    # sklearn takes over a second to import, only pay for it here
+    from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
+    A, nodes = adjacency(graph, weight=weight)
+    seeds = [seed + i for i in range(runs)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    labels = [None] * runs
+    if processes <= 1 or runs <= 1:
+        for done, run_seed in enumerate(seeds, 1):
+            labels[done - 1] = louvain_csr(A, resolution, run_seed, refine)
+            if progress is not None:
+                progress(done / runs)
+    else:
+        # A is pickled once per worker, the tasks only carry their seed
+        pool = ProcessPoolExecutor(max_workers=min(processes, runs), initializer=_init_ensemble_worker,
+                                   initargs=(A, resolution, refine))
+        try:
+            futures = {pool.submit(_ensemble_worker_run, run_seed): i for i, run_seed in enumerate(seeds)}
+            for done, future in enumerate(as_completed(futures), 1):
+                labels[futures[future]] = future.result()
+                if progress is not None:
+                    progress(done / runs)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    labels = np.array(labels).reshape(runs, len(nodes))
+    consensus = consensus_labels(A, labels, threshold, seed, refine)
+    degrees = np.asarray(A.sum(axis=1)).ravel()
+    two_m = A.sum()
+    result = {
+        'seeds': seeds,
+        'partitions': [dict(zip(nodes, row.tolist())) for row in labels],
+        'communities': [int(row.max()) + 1 if len(row) else 0 for row in labels],
+        'modularity': [float(_quality(A, row, degrees, two_m, 1.0)) if two_m else 0.0 for row in labels],
+        'consensus': dict(zip(nodes, consensus.tolist())),
+        'nmi': _pairwise(labels, normalized_mutual_info_score),
+        'ari': _pairwise(labels, adjusted_rand_score),
+    }
+    if ground_truth is not None:
+        known = np.array([node in ground_truth for node in nodes], dtype=bool)
+        classes = [ground_truth[node] for node, is_known in zip(nodes, known) if is_known]
+        result['class_nmi'] = [normalized_mutual_info_score(classes, row[known]) for row in labels]
+        result['consensus_nmi'] = normalized_mutual_info_score(classes, consensus[known])
+    return result
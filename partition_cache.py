@@ -0,0 +1,104 @@
+import os
+import pickle
+from collections import OrderedDict
+
+from louvain import best_partition
+from tracing import tracer
+
+DEFAULT_RESOLUTION = 1.0
+DEFAULT_SEED = 42  # fixed seed so every evaluation panel describes the same partition
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".partition_cache")
+
+
+class PartitionCache:
+    """Content-addressed Louvain partition cache.
+
+    Partitions are keyed by (edge data hash, direction, method, resolution, seed), kept in an
+    in-memory LRU and persisted to disk, so one Louvain run serves every panel and
+    every later session on the same dataset."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=16, max_disk_entries=64):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+
+    @staticmethod
+    def make_key(data_hash, directed, resolution=DEFAULT_RESOLUTION, seed=DEFAULT_SEED, refine=False):
+        direction = "directed" if directed else "undirected"
+        method = "leiden" if refine else "louvain"
+        return f"{data_hash}-{direction}-{method}-r{resolution:g}-s{seed}"
+
+    def get(self, G, data_hash, directed, resolution=DEFAULT_RESOLUTION, seed=DEFAULT_SEED,
+            init_partition=None, refine=False):
+        """Returns the Louvain partition of G, running best_partition only on a cache miss.
+        A directed G is symmetrized; refine=True adds the Leiden refinement step.
+
+        init_partition (e.g. the partition before new edges were appended) seeds the
+        run on a miss; nodes it does not know start in their own community. A
+        warm-started result depends on the seed, not only on the key, so it is kept in
+        memory only and never written to disk."""
+        key = self.make_key(data_hash, directed, resolution, seed, refine)
+        partition = self._memory.get(key)
+        if partition is None:
+            with tracer.stage("load cached partition"):
+                partition = self._load(key)
+        if partition is None:
+            with tracer.stage("best_partition"):
+                partition = best_partition(G, partition=init_partition, resolution=resolution, random_state=seed,
+                                           refine=refine)
+            if init_partition is None:
+                self._save(key, partition)
+        self._remember(key, partition)
+        return partition
+
+    def put(self, key, partition):
+        """Stores a partition computed elsewhere for the given key."""
+        self._save(key, partition)
+        self._remember(key, partition)
+
+    def clear(self):
+        self._memory.clear()
+        for path in self._disk_entries():
+            os.remove(path)
+
+    def _remember(self, key, partition):
+        self._memory[key] = partition
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def _disk_entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".pkl")]
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                partition = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(path)  # mark as recently used for disk LRU eviction
+        return partition
+
+    def _save(self, key, partition):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(partition, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+            self._evict_disk()
+        except OSError:
+            # the disk cache is only an optimisation, the in-memory copy is still valid
+            pass
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=os.path.getmtime)
+        for path in entries[:max(0, len(entries) - self.max_disk_entries)]:
+            os.remove(path)
@@ -0,0 +1,155 @@
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgb
+
+FAST_EDGE_CUTOFF = 2000  # above this many edges views switch to the aggregated rendering
+RASTER_EDGE_CUTOFF = 20000  # above this many edges they are drawn as one image
+MAX_LABELS = 40  # node labels drawn in the aggregated rendering, most important first
+ARROW_SIZE = 0.025  # arrowhead length in layout units ([-1, 1] box)
+RASTER_SAMPLES_PER_PIXEL = 16  # caps the edge image cost, however long the edges are
+
+
+def use_fast_mode(G, cutoff=FAST_EDGE_CUTOFF):
+    return G.number_of_edges() > cutoff
+
+
+def edge_segments(G, pos, edgelist=None):
+    """(m, 2, 2) array of edge start and end points."""
+    edgelist = list(G.edges()) if edgelist is None else edgelist
+    if not edgelist:
+        return np.zeros((0, 2, 2))
+    nodes = list(pos)
+    index = {node: i for i, node in enumerate(nodes)}
+    xy = np.array([pos[node] for node in nodes], dtype=np.float64)
+    ends = np.array([(index[u], index[v]) for u, v in edgelist], dtype=np.int64)
+    return np.stack([xy[ends[:, 0]], xy[ends[:, 1]]], axis=1)
+
+
+def default_alpha(n_edges):
+    """Transparency that keeps dense regions readable: opaque for a few hundred edges,
+    down to 0.05 for hundreds of thousands."""
+    return float(np.clip(20 / np.sqrt(max(n_edges, 1)), 0.05, 1.0))
+
+
+def arrow_heads(segments, size=ARROW_SIZE, shrink=0.02):
+    """One triangle per segment pointing at its end point (pulled back by shrink so it
+    is not hidden under the target node)."""
+    direction = segments[:, 1] - segments[:, 0]
+    length = np.maximum(np.linalg.norm(direction, axis=1, keepdims=True), 1e-9)
+    direction = direction / length
+    normal = direction[:, ::-1] * np.array([-1, 1])
+    tip = segments[:, 1] - direction * np.minimum(shrink, length / 2)
+    base = tip - direction * size
+    return np.stack([tip, base + normal * size / 2, base - normal * size / 2], axis=1)
+
+
+def edge_image(segments, extent, shape, color='gray', alpha=0.05, weights=None,
+               max_samples_per_pixel=RASTER_SAMPLES_PER_PIXEL):
+    """Rasterizes segments into an RGBA image of shape (height, width) covering extent
+    (x0, x1, y0, y1). Every segment is sampled once per pixel it crosses and the
+    samples falling in a pixel are composited as that many strokes of the given alpha
+    (times weights, one value per segment, when given).
+
+    The samples are capped at max_samples_per_pixel times the image size: beyond it
+    every segment is sampled with the same stride instead, starting at a random
+    offset, and each sample carries the strokes of the pixels it stands for. The
+    total ink stays the same and the cost no longer grows with the edge lengths."""
+    height, width = shape
+    x0, x1, y0, y1 = extent
+    scale = np.array([(width - 1) / max(x1 - x0, 1e-9), (height - 1) / max(y1 - y0, 1e-9)])
+    px = ((segments - [x0, y0]) * scale).astype(np.float32)
+    delta = px[:, 1] - px[:, 0]
+    lengths = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64)
+    stride = max((lengths + 1).sum() / (max_samples_per_pixel * height * width), 1.0)
+    if stride > 1:
+        n_samples = np.ceil((lengths + 1) / stride).astype(np.int64)
+        # seeded, so redrawing the same view gives the same image
+        phase = np.random.default_rng(0).random(len(px)).astype(np.float32)
+        ink = (lengths + 1) / n_samples
+    else:
+        n_samples = lengths + 1
+        phase = ink = None
+    weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+    if ink is not None:
+        weights = ink if weights is None else weights * ink
+    density = np.zeros(height * width)
+    chunk = 50000  # bounds the temporary sample arrays
+    for start in range(0, len(px), chunk):
+        counts = n_samples[start:start + chunk]
+        segment = np.repeat(np.arange(len(counts)), counts)
+        first = np.cumsum(counts) - counts
+        step = np.arange(counts.sum()) - first[segment]
+        if phase is None:
+            t = (step / np.maximum(counts - 1, 1)[segment]).astype(np.float32)
+        else:
+            t = ((step + phase[start:start + chunk][segment]) / counts[segment]).astype(np.float32)
+        x = px[start:start + chunk, 0, 0][segment] + delta[start:start + chunk, 0][segment] * t
+        y = px[start:start + chunk, 0, 1][segment] + delta[start:start + chunk, 1][segment] * t
+        pixel = (y + 0.5).astype(np.int64) * width + (x + 0.5).astype(np.int64)
+        sample_weights = None if weights is None else weights[start:start + chunk][segment]
+        density += np.bincount(pixel, weights=sample_weights, minlength=height * width)
+    rgba = np.zeros((height, width, 4))
+    rgba[..., :3] = to_rgb(color)
+    rgba[..., 3] = 1 - (1 - alpha) ** density.reshape(height, width)
+    return rgba
+
+
+def _image_geometry(ax, segments):
+    points = segments.reshape(-1, 2)
+    low, high = points.min(axis=0), points.max(axis=0)
+    extent = (low[0], high[0], low[1], high[1])
+    bbox = ax.get_window_extent()
+    shape = (max(int(bbox.height), 100), max(int(bbox.width), 100))
+    return extent, shape
+
+
+def draw_edge_collection(ax, G, pos, width=0.5, color='gray', alpha=None, arrows=False):
+    """Draws every edge of G as one artist instead of one per edge: a LineCollection
+    (plus one PolyCollection of arrowheads with arrows) or, above RASTER_EDGE_CUTOFF
+    edges, a single image (widths act as per-edge intensity, arrows are left out).
+    Returns (edges, heads), heads is None without arrows."""
+    segments = edge_segments(G, pos)
+    if alpha is None:
+        alpha = default_alpha(len(segments))
+    if len(segments) > RASTER_EDGE_CUTOFF:
+        extent, shape = _image_geometry(ax, segments)
+        weights = None if np.isscalar(width) else np.asarray(width) / np.mean(width)
+        image = ax.imshow(edge_image(segments, extent, shape, color, alpha, weights), extent=extent,
+                          origin='lower', interpolation='nearest', aspect='auto', zorder=1)
+        return image, None
+    lines = LineCollection(segments, linewidths=width, colors=color, alpha=alpha, rasterized=True, zorder=1)
+    ax.add_collection(lines)
+    heads = None
+    if arrows:
+        heads = PolyCollection(arrow_heads(segments), facecolors=color, edgecolors='none',
+                               alpha=min(1.0, alpha * 2), rasterized=True, zorder=1)
+        ax.add_collection(heads)
+    return lines, heads
+
+
+def update_edge_collection(edges, heads, G, pos):
+    """Moves the artists returned by draw_edge_collection to the edges of G. Returns
+    False when they cannot be reused (the rendering kind would change)."""
+    segments = edge_segments(G, pos)
+    raster = len(segments) > RASTER_EDGE_CUTOFF
+    if raster != (not isinstance(edges, LineCollection)):
+        return False
+    if raster:
+        extent, shape = _image_geometry(edges.axes, segments)
+        color = edges.get_array()[0, 0, :3]  # every pixel carries the edge colour
+        edges.set_data(edge_image(segments, extent, shape, color, default_alpha(len(segments))))
+        edges.set_extent(extent)
+        return True
+    edges.set_segments(segments)
+    if heads is not None:
+        heads.set_verts(arrow_heads(segments))
+    return True
+
+
+def important_labels(G, nodes=None, max_labels=MAX_LABELS, score=None):
+    """Labels for the max_labels nodes with the highest score (degree by default)."""
+    nodes = list(G) if nodes is None else list(nodes)
+    if len(nodes) > max_labels:
+        score = dict(G.degree()) if score is None else score
+        nodes = sorted(nodes, key=lambda node: score[node], reverse=True)[:max_labels]
+    return {node: node for node in nodes}
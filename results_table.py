@@ -0,0 +1,189 @@
+import tkinter as tk
+from tkinter import filedialog, ttk
+
+import numpy as np
+
+
+class TableModel:
+    """Column arrays of a result table plus the current row order.
+
+    Sorting permutes an index array with np.argsort on the column itself, and only
+    the rows asked for by rows() are ever formatted as text."""
+
+    def __init__(self, columns, arrays, digits=4):
+        self.columns = list(columns)
+        self.arrays = [np.asarray(array) for array in arrays]
+        # decimals shown for float columns, one value for all or one per column
+        self.digits = [digits] * len(self.columns) if np.isscalar(digits) else list(digits)
+        self.order = np.arange(len(self.arrays[0]) if self.arrays else 0)
+        self.sort_column = None
+        self.descending = False
+        self.widths = [self._width(name, array, digits)
+                       for name, array, digits in zip(self.columns, self.arrays, self.digits)]
+
+    @classmethod
+    def from_frame(cls, df, digits=4):
+        """The index (e.g. Node ID) becomes the first column."""
+        columns = [df.index.name or ''] + [str(column) for column in df.columns]
+        arrays = [df.index.to_numpy()] + [df[column].to_numpy() for column in df.columns]
+        return cls(columns, arrays, digits)
+
+    def __len__(self):
+        return len(self.order)
+
+    @staticmethod
+    def _format(value, array, digits):
+        if np.issubdtype(array.dtype, np.floating):
+            return f"{value:.{digits}f}"
+        return str(value)
+
+    def _width(self, name, array, digits):
+        if not len(array):
+            return len(name)
+        if np.issubdtype(array.dtype, np.number):
+            # the widest value is one of the extremes, no need to format every row
+            samples = [array.min(), array.max()]
+        else:
+            samples = array[:1000]
+        return max([len(name)] + [len(self._format(value, array, digits)) for value in samples])
+
+    def sort(self, column):
+        """Sorts by column; sorting again by the same column flips the direction.
+        Numbers start highest first, text A to Z."""
+        array = self.arrays[column]
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.descending = np.issubdtype(array.dtype, np.number)
+        order = np.argsort(array, kind='stable')
+        self.order = order[::-1] if self.descending else order
+        self.sort_column = column
+
+    def header(self):
+        return "  ".join(name.rjust(width) for name, width in zip(self.columns, self.widths))
+
+    def rows(self, first, count):
+        """Formatted text of rows first .. first + count in the current order."""
+        lines = []
+        for row in self.order[first:first + count]:
+            lines.append("  ".join(self._format(array[row], array, digits).rjust(width)
+                                   for array, width, digits in zip(self.arrays, self.widths, self.digits)))
+        return lines
+
+    def column_at(self, char):
+        """Column under character offset char of the header line."""
+        end = 0
+        for column, width in enumerate(self.widths):
+            end += width + 2
+            if char < end:
+                return column
+        return len(self.widths) - 1
+
+    def to_frame(self):
+        """The full table in the current order."""
+        import pandas as pd
+        data = {name: array[self.order] for name, array in zip(self.columns[1:], self.arrays[1:])}
+        return pd.DataFrame(data, index=pd.Index(self.arrays[0][self.order], name=self.columns[0]))
+
+
+class ResultsTable(tk.Frame):
+    """Scrollable, sortable view of a TableModel that only renders the visible rows,
+    so tables of tens of thousands of nodes open and scroll instantly. Clicking a
+    header sorts by that column; Export writes the whole table as CSV."""
+
+    def __init__(self, master, height=30, width=35, text_background="#D5F5E3", **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = None
+        self.first = 0
+        self.visible = height - 1
+        self.note = tk.StringVar()
+        tk.Label(self, textvariable=self.note, background=self['background'],
+                 anchor='w', justify=tk.LEFT).grid(row=0, column=0, columnspan=2, sticky='we')
+        self.header = tk.Text(self, height=1, width=width, background=text_background, wrap='none', cursor='hand2')
+        self.header.grid(row=1, column=0, sticky='we')
+        self.body = tk.Text(self, height=self.visible, width=width, background=text_background, wrap='none')
+        self.body.grid(row=2, column=0, sticky='nswe')
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.grid(row=2, column=1, sticky='ns')
+        # header and body scroll sideways together when the columns do not fit
+        self.xscrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.xview)
+        self.xscrollbar.grid(row=3, column=0, sticky='we')
+        self.body.configure(xscrollcommand=self.xscrollbar.set)
+        self.export_button = ttk.Button(self, text="Export", command=self.export)
+        self.export_button.grid(row=4, column=0, columnspan=2, pady=(3, 0))
+
+        self.header.bind('<Button-1>', self.on_header_click)
+        for widget in (self.header, self.body):
+            widget.bind('<MouseWheel>', lambda event: self.scroll(-event.delta // 120))
+            widget.bind('<Button-4>', lambda event: self.scroll(-3))
+            widget.bind('<Button-5>', lambda event: self.scroll(3))
+        self.body.bind('<Prior>', lambda event: self.scroll(-self.visible))
+        self.body.bind('<Next>', lambda event: self.scroll(self.visible))
+
+    def show(self, model, note=""):
+        self.model = model
+        self.first = 0
+        self.note.set(note)
+        self._set_text(self.header, model.header())
+        self.xview('moveto', 0)
+        self.render()
+
+    def set_note(self, note):
+        self.note.set(note)
+
+    def scroll(self, rows):
+        self.first += rows
+        self.render()
+        return 'break'
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'/'pages')."""
+        if self.model is None:
+            return
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * len(self.model))
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            self.first += int(args[1]) * step
+        self.render()
+
+    def xview(self, *args):
+        self.header.xview(*args)
+        self.body.xview(*args)
+
+    def render(self):
+        if self.model is None:
+            return
+        n = len(self.model)
+        self.first = max(0, min(self.first, n - self.visible))
+        x = self.body.xview()[0]
+        self._set_text(self.body, "\n".join(self.model.rows(self.first, self.visible)))
+        self.xview('moveto', x)
+        if n:
+            self.scrollbar.set(self.first / n, min(1.0, (self.first + self.visible) / n))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def on_header_click(self, event):
+        if self.model is None:
+            return 'break'
+        char = int(self.header.index(f"@{event.x},{event.y}").split('.')[1])
+        self.model.sort(self.model.column_at(char))
+        self.first = 0
+        self.render()
+        return 'break'
+
+    def export(self):
+        if self.model is None:
+            return
+        path = filedialog.asksaveasfilename(title="Export Table", defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv")])
+        if path:
+            self.model.to_frame().to_csv(path)
+
+    @staticmethod
+    def _set_text(widget, text):
+        widget.configure(state='normal')
+        widget.delete('1.0', tk.END)
+        widget.insert('1.0', text)
+        widget.configure(state='disabled')
@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import tracer
+
+
+class TaskCancelled(Exception):
+    """Raised inside a worker when the user pressed Cancel."""
+
+
+class Task:
+    """State of one running analysis, shared between the worker and the Tk main thread."""
+
+    def __init__(self, name, cancellable=True):
+        self.name = name
+        self.cancellable = cancellable
+        self.stage = ""
+        self.fraction = None  # None means the progress is unknown (indeterminate bar)
+        self.started = time.perf_counter()
+        self._cancel_event = threading.Event()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def progress(self, stage, fraction=None):
+        """Reports the current stage from the worker and stops it if it was cancelled."""
+        self.check()
+        tracer.phase(stage)
+        self.stage = stage
+        self.fraction = fraction
+
+    def check(self):
+        if self.cancelled:
+            raise TaskCancelled(self.name)
+
+
+class TaskRunner:
+    """Runs analyses off the Tk main thread and marshals results back with master.after.
+
+    Tasks receive the Task object as first argument and are cancelled cooperatively
+    at their next progress() call. The runner stays busy until a cancelled worker has
+    really returned, so no second task can touch the shared graph and partition state
+    while it is still running."""
+
+    def __init__(self, master, on_update=None, max_workers=2, poll_ms=100):
+        self.master = master
+        self.on_update = on_update  # called on the main thread with the Task (or None when idle)
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.task = None
+        self._future = None
+        self._on_done = None
+        self._on_error = None
+
+    @property
+    def busy(self):
+        return self.task is not None
+
+    def submit(self, name, func, args=(), on_done=None, on_error=None, cancellable=True):
+        """Starts func in a worker; on_done(result) / on_error(exc) run on the Tk main thread.
+        Tasks that change shared data (e.g. appending edges) pass cancellable=False."""
+        if self.busy:
+            return None
+        self.task = Task(name, cancellable)
+        self._on_done = on_done
+        self._on_error = on_error
+        self._future = self.executor.submit(func, self.task, *args)
+        self._notify()
+        self.master.after(self.poll_ms, self._poll, self.task)
+        return self.task
+
+    def cancel(self):
+        """Asks the running task to stop; returns False when there is none or it cannot be cancelled."""
+        if not self.busy or not self.task.cancellable:
+            return False
+        self.task.cancel()
+        # a cancelled thread may still finish its current networkx call: _poll keeps the
+        # runner busy until it returns, then drops its result
+        self._notify()
+        return True
+
+    def _poll(self, task):
+        if task is not self.task:
+            return
+        if self._future.done():
+            exc = self._future.exception()
+            self._deliver(task, exc is None, exc if exc is not None else self._future.result())
+            return
+        self._notify()
+        self.master.after(self.poll_ms, self._poll, task)
+
+    def _deliver(self, task, ok, value):
+        on_done, on_error = self._on_done, self._on_error
+        self._finish()
+        if task.cancelled or isinstance(value, TaskCancelled):
+            return
+        if ok:
+            if on_done is not None:
+                on_done(value)
+        elif on_error is not None:
+            on_error(value)
+        else:
+            raise value
+
+    def _finish(self):
+        self.task = None
+        self._future = None
+        self._on_done = None
+        self._on_error = None
+        self._notify()
+
+    def _notify(self):
+        if self.on_update is not None:
+            self.on_update(self.task)
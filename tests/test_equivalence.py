@@ -0,0 +1,116 @@
+"""Checks that the array-based replacements give the same results as the networkx
+calls they replaced."""
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from centrality import shortest_path_sweep
+from community_metrics import modularity_csr, partition_labels, to_csr
+from csr_graph import CSRGraph
+from edge_stream import ingest_edges
+from graph_store import aggregate_contacts, contact_graph
+
+
+def contact_rows(n_rows=2000, n_nodes=60, seed=0):
+    """Edge rows like the contact files: repeated pairs in both directions and a Weight."""
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(1, n_nodes, n_rows)
+    targets = rng.integers(1, n_nodes, n_rows)
+    keep = sources != targets
+    return pd.DataFrame({"Source": sources[keep], "Target": targets[keep],
+                         "Weight": rng.integers(1, 5, keep.sum())})
+
+
+def edge_attributes(G):
+    """{pair: attributes}, with undirected pairs in a fixed orientation."""
+    def pair(u, v):
+        return (u, v) if G.is_directed() else tuple(sorted((u, v)))
+    return {pair(u, v): {name: float(value) for name, value in data.items()} for u, v, data in G.edges(data=True)}
+
+
+def assert_scores_close(result, expected):
+    assert result.keys() == expected.keys()
+    for node, value in expected.items():
+        assert result[node] == pytest.approx(value, abs=1e-9)
+
+
+@pytest.mark.parametrize("G", [nx.karate_club_graph(),
+                               nx.gnm_random_graph(40, 60, seed=1),
+                               nx.gnm_random_graph(30, 80, seed=2, directed=True)],
+                         ids=["karate", "disconnected", "directed"])
+@pytest.mark.parametrize("betweenness", [True, False])
+def test_sweep_matches_networkx(G, betweenness):
+    G = G.copy()  # the sweep is cached per graph object
+    sweep = shortest_path_sweep(G, betweenness=betweenness)
+    assert_scores_close(sweep['closeness'], nx.closeness_centrality(G))
+    assert_scores_close(sweep['harmonic'], nx.harmonic_centrality(G))
+    if betweenness:
+        assert_scores_close(sweep['betweenness'], nx.betweenness_centrality(G))
+    else:
+        assert 'betweenness' not in sweep
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("resolution", [1.0, 0.5])
+def test_modularity_csr_matches_networkx(directed, resolution):
+    G = nx.gnm_random_graph(50, 200, seed=3, directed=directed)
+    for u, v in G.edges():
+        G[u][v]['weight'] = (u + v) % 4 + 1
+    G.add_edge(7, 7, weight=2)
+    communities = nx.community.louvain_communities(G.to_undirected(), seed=0)
+    partition = {node: c for c, members in enumerate(communities) for node in members}
+    A, nodes = to_csr(G)
+    labels, community_ids = partition_labels(partition, nodes)
+    value = modularity_csr(A, labels, len(community_ids), directed, resolution).sum()
+    assert value == pytest.approx(nx.community.modularity(G, communities, resolution=resolution), abs=1e-12)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_ingest_edges_matches_from_contacts(tmp_path, directed):
+    edge_df = contact_rows(n_rows=60000, n_nodes=500)
+    path = tmp_path / "edges.csv"
+    edge_df.to_csv(path, index=False)
+    # with 1 MB the rows are spilled to several sorted runs that have to be merged
+    streamed = ingest_edges(str(path), str(tmp_path / "csr"), directed=directed, memory_mb=1)
+    in_memory = CSRGraph.from_contacts(aggregate_contacts(edge_df, symmetrize=not directed), directed)
+    assert set(streamed.node_ids.tolist()) == set(in_memory.node_ids.tolist())
+    assert edge_attributes(streamed.to_networkx()) == edge_attributes(in_memory.to_networkx())
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_contact_graph_matches_edgelist_graph(directed):
+    edge_df = contact_rows()
+    create_using = nx.DiGraph() if directed else nx.Graph()
+    baseline = nx.from_pandas_edgelist(edge_df, source="Source", target="Target", create_using=create_using)
+    G = contact_graph(aggregate_contacts(edge_df, symmetrize=not directed), directed)
+    assert set(G) == set(baseline)
+    assert edge_attributes(G).keys() == edge_attributes(baseline).keys()
+    # the aggregated attributes add up every row of the pair
+    for (u, v), data in edge_attributes(G).items():
+        rows = (edge_df.Source == u) & (edge_df.Target == v)
+        if not directed:
+            rows |= (edge_df.Source == v) & (edge_df.Target == u)
+        assert data == {'contacts': rows.sum(), 'Weight': edge_df.Weight[rows].sum()}
+
+
+
+def communities_of(partition):
+    communities = {}
+    for node, c in partition.items():
+        communities.setdefault(c, set()).add(node)
+    return list(communities.values())
+
+
+def test_resolution_sweep_reports_standard_modularity():
+    from louvain import louvain_ensemble, resolution_sweep
+    G = nx.karate_club_graph()
+    # at resolution 0.5 the resolution-weighted quality is well above the modularity
+    results = resolution_sweep(G, [0.5, 1.0, 2.0], random_state=0)
+    partitions = [result['partition'] for result in results]
+    values = [result['modularity'] for result in results]
+    ensemble = louvain_ensemble(G, runs=2, resolution=0.5)
+    partitions += ensemble['partitions']
+    values += ensemble['modularity']
+    for partition, value in zip(partitions, values):
+        assert value == pytest.approx(nx.community.modularity(G, communities_of(partition)), abs=1e-12)
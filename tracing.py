@@ -0,0 +1,163 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_DISABLED = nullcontext()
+
+
+class Tracer:
+    """Wall time of the pipeline stages (CSV parsing, graph building, Louvain, the metric,
+    layout, drawing) of each user action.
+
+    Code marks a stage with `with tracer.stage("name"):`; while tracing is off that is a
+    shared no-op context, so the instrumentation costs one attribute check. phase(name)
+    is the lighter form used by Task.progress: a phase lasts until the next phase of
+    the same thread or the end of the enclosing stage.
+
+    Stages recorded between two actions are counted in the next one, so synchronous
+    work done before a task is submitted still shows up in its breakdown. With
+    profile, cProfile runs during the stages marked profiled=True."""
+
+    def __init__(self):
+        self.enabled = False
+        self.profile = False
+        self.events = []  # finished spans since the last clear(), for the trace export
+        self._origin = time.perf_counter()
+        self._first = 0  # first event of the current action
+        self._action = None  # (name, start)
+        self._profiler = None
+        self._stats = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def stage(self, name, profiled=False):
+        if not self.enabled:
+            return _DISABLED
+        return self._span(name, profiled)
+
+    @contextmanager
+    def _span(self, name, profiled):
+        start = time.perf_counter()
+        profiler = self._profiler if profiled and self.profile else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            end = time.perf_counter()
+            phase = getattr(self._local, 'phase', None)
+            if phase is not None and phase[1] >= start:
+                self._local.phase = None
+                self._record(phase[0], phase[1], end, 'phase')
+            self._record(name, start, end, 'stage')
+
+    def phase(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        phase = getattr(self._local, 'phase', None)
+        if phase is not None:
+            if phase[0] == name:
+                return
+            self._record(phase[0], phase[1], now, 'phase')
+        self._local.phase = (name, now)
+
+    def _record(self, name, start, end, category):
+        with self._lock:
+            self.events.append({'name': name, 'start': start, 'end': end, 'category': category,
+                                'thread': threading.get_ident()})
+
+    def begin(self, name):
+        """Starts an action (a button press); end() returns its breakdown."""
+        if not self.enabled:
+            return
+        self._action = (name, time.perf_counter())
+        if self.profile:
+            self._profiler = cProfile.Profile()
+
+    def end(self):
+        """Finishes the current action and returns its timing report (None when tracing
+        is off or no action was started)."""
+        if self._action is None:
+            return None
+        name, start = self._action
+        end = time.perf_counter()
+        with self._lock:
+            spans = self.events[self._first:]
+            start = min([start] + [span['start'] for span in spans])
+            self.events.append({'name': name, 'start': start, 'end': end, 'category': 'action',
+                                'thread': threading.get_ident()})
+            self._first = len(self.events)
+        self._action = None
+        if self._profiler is not None:
+            try:
+                self._stats = pstats.Stats(self._profiler)
+            except TypeError:
+                pass  # no profiled stage ran, keep the previous stats
+            self._profiler = None
+        return self.report(name, end - start, spans)
+
+    def discard(self):
+        """Drops the current action (e.g. it was cancelled)."""
+        self._action = None
+        self._profiler = None
+        with self._lock:
+            self._first = len(self.events)
+
+    @staticmethod
+    def report(name, total, spans):
+        """Text breakdown of one action: every span with its share of the total, nested
+        spans of the same thread indented under the span containing them."""
+        spans = sorted(spans, key=lambda span: (span['start'], -span['end']))
+        lines = [f" Timing of {name} : {total:.3f} s"]
+        for i, span in enumerate(spans):
+            depth = sum(1 for outer in spans[:i] if outer['thread'] == span['thread']
+                        and outer['start'] <= span['start'] and span['end'] <= outer['end'])
+            seconds = span['end'] - span['start']
+            share = seconds / total * 100 if total > 0 else 0
+            lines.append(f" {'  ' * depth}{span['name']} : {seconds:.3f} s ({share:.0f}%)")
+        return "\n".join(lines)
+
+    def profile_text(self, limit=15):
+        """The most expensive functions of the last profiled action, by cumulative time
+        (empty when no action was profiled)."""
+        if self._stats is None:
+            return ""
+        self._stats.stream = io.StringIO()
+        self._stats.sort_stats('cumulative').print_stats(limit)
+        return self._stats.stream.getvalue()
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+            self._first = 0
+
+    def export_chrome_trace(self, path):
+        """Writes the recorded spans as Chrome trace / Perfetto JSON ("X" complete events,
+        microseconds); with a profiled action also its cProfile stats next to it (.prof).
+        Returns the paths written."""
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = [{'name': event['name'], 'cat': event['category'], 'ph': 'X', 'pid': pid, 'tid': event['thread'],
+                  'ts': round((event['start'] - self._origin) * 1e6, 1),
+                  'dur': round((event['end'] - event['start']) * 1e6, 1)} for event in events]
+        with open(path, "w") as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        paths = [path]
+        if self._stats is not None:
+            profile_path = os.path.splitext(path)[0] + ".prof"
+            self._stats.dump_stats(profile_path)
+            paths.append(profile_path)
+        return paths
+
+
+# the tracer shared by the GUI and the analysis modules
+tracer = Tracer()